@@ -1,23 +1,43 @@
 from .nodes.iterator.iterator_counter import IteratorCounter
 from .nodes.iterator.iterator_item import IteratorItem
 from .nodes.iterator.iterator_list import IteratorList
+from .nodes.iterator.iterator_manifest import IteratorManifestList
 from .nodes.iterator.iterator_signal import IteratorSignal
+from .nodes.iterator.iterator_sweep import IteratorSweep, SweepParam
 from .nodes.video_concatenation.video_concatenation import VideoConcatenation
+from .nodes.video_concatenation.video_append import VideoAppend
+from .metrics import register_routes
 
 NODE_CLASS_MAPPINGS = {
     "IteratorCounter": IteratorCounter,
     "IteratorItem": IteratorItem,
     "IteratorList": IteratorList,
+    "IteratorManifestList": IteratorManifestList,
     "IteratorSignal": IteratorSignal,
+    "IteratorSweep": IteratorSweep,
+    "SweepParam": SweepParam,
     "VideoConcatenation": VideoConcatenation,
+    "VideoAppend": VideoAppend,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "IteratorCounter": "Iterator Counter",
     "IteratorItem": "Iterator Item",
     "IteratorList": "Iterator List",
+    "IteratorManifestList": "Iterator Manifest List",
     "IteratorSignal": "Iterator Signal",
+    "IteratorSweep": "Iterator Sweep",
+    "SweepParam": "Sweep Param",
     "VideoConcatenation": "Video Concatenation",
+    "VideoAppend": "Video Append",
 }
 
+# JSON metrics endpoint; absent when loaded outside a running ComfyUI server
+try:
+    import server
+
+    register_routes(server.PromptServer.instance)
+except (ImportError, AttributeError):
+    pass
+
 __all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"]
@@ -0,0 +1,377 @@
+import os
+import re
+import sys
+import json
+import time
+import types
+import argparse
+import itertools
+import resource
+import platform
+import subprocess
+import importlib.util
+
+# Standalone benchmark for the concatenation engine. Synthetic clips are
+# generated with ffmpeg's testsrc/sine sources, so no media and no ComfyUI
+# install are needed; only ffmpeg/ffprobe on PATH and ffmpeg-python.
+#
+#   python benchmarks/bench_concat.py --output report.json
+#   python benchmarks/bench_concat.py --compare old.json new.json
+#
+# Clips are generated by the suite, and each case runs in its own child
+# process, so RUSAGE_CHILDREN there covers exactly the ffmpeg processes of
+# that case.
+
+_PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "nodes",
+    "video_concatenation",
+)
+_PACKAGE = "bench_video_concatenation"
+
+# Matrix axes; --full runs the whole product, the default a quick subset
+_FULL_MATRIX = {
+    "clips": [4, 16],
+    "duration": [2.0],
+    "resolution": ["320x240", "1280x720"],
+    "audio": [True, False],
+    "mismatched": [False, True],
+    "concat_mode": ["auto", "re_encode"],
+    "transition": ["none", "fade"],
+    "output_format": ["mp4", "mkv", "mov", "webm", "avi", "gif"],
+    "encode_engine": ["serial", "chunked"],
+    "encoder_profile": ["draft", "balanced", "final"],
+}
+_QUICK_MATRIX = {
+    "clips": [4],
+    "duration": [2.0],
+    "resolution": ["320x240"],
+    "audio": [True, False],
+    "mismatched": [False, True],
+    "concat_mode": ["auto", "re_encode"],
+    "transition": ["none", "fade"],
+    "output_format": ["mp4"],
+    "encode_engine": ["serial"],
+    "encoder_profile": ["balanced"],
+}
+_FPS = 24
+
+
+def load_engine(temp_dir):
+    # The node package imports folder_paths (a ComfyUI module); a stub that
+    # points every directory at the work dir is enough for the engine
+    stub = types.ModuleType("folder_paths")
+    stub.get_temp_directory = lambda: temp_dir
+    stub.get_output_directory = lambda: temp_dir
+    stub.get_input_directory = lambda: temp_dir
+    sys.modules.setdefault("folder_paths", stub)
+
+    spec = importlib.util.spec_from_file_location(
+        _PACKAGE,
+        os.path.join(_PACKAGE_DIR, "__init__.py"),
+        submodule_search_locations=[_PACKAGE_DIR],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[_PACKAGE] = package
+    if os.path.exists(spec.origin):
+        spec.loader.exec_module(package)
+    return importlib.import_module(f"{_PACKAGE}.concat_engine")
+
+
+# Axes added after the first reports; left out of case ids at these values
+# so reports stay comparable across versions
+_AXIS_DEFAULTS = {"encode_engine": "serial", "encoder_profile": "balanced"}
+
+
+def case_id(case):
+    return "|".join(
+        f"{k}={case[k]}"
+        for k in sorted(case)
+        if k not in _AXIS_DEFAULTS or case[k] != _AXIS_DEFAULTS[k]
+    )
+
+
+def clip_specs(case):
+    # Mismatched cases alternate resolution and frame rate between clips,
+    # which forces the planner off the stream copy path
+    width, height = (int(v) for v in case["resolution"].split("x"))
+    specs = []
+    for i in range(case["clips"]):
+        w, h, fps = width, height, _FPS
+        if case["mismatched"] and i % 2:
+            w, h, fps = width // 2 * 2 + 16, height // 2 * 2 + 16, 30
+        specs.append((w, h, fps, case["audio"], case["duration"]))
+    return specs
+
+
+def make_clip(media_dir, spec):
+    # Clips with the same spec share one file, so repeated paths are covered
+    w, h, fps, audio, duration = spec
+    path = os.path.join(
+        media_dir, f"src_{w}x{h}_{fps}_{'a' if audio else 'na'}_{duration}.mp4"
+    )
+    if os.path.exists(path):
+        return path
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-y",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=duration={duration}:size={w}x{h}:rate={fps}",
+    ]
+    if audio:
+        cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}"]
+        cmd += ["-c:a", "aac", "-shortest"]
+    # One-second GOP, written under a temp name so an aborted run never
+    # leaves a truncated clip behind for the next one to reuse
+    cmd += ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", str(fps)]
+    cmd += ["-f", "mp4", path + ".tmp"]
+    subprocess.run(cmd, check=True)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def count_frames(path):
+    # Decoded video frames of the output; not part of the timed section
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-map", "0:v:0", "-f", "null", "-"]
+        + ["-progress", "pipe:1", "-nostats"],
+        capture_output=True,
+        text=True,
+    )
+    frames = re.findall(r"^frame=(\d+)", result.stdout, re.MULTILINE)
+    return int(frames[-1]) if frames else 0
+
+
+def run_case(case, work_dir):
+    media_dir = os.path.join(work_dir, "media")
+    out_dir = os.path.join(work_dir, "out")
+    os.makedirs(media_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
+    clips = [make_clip(media_dir, spec) for spec in clip_specs(case)]
+
+    engine = load_engine(out_dir)
+    output_path = os.path.join(out_dir, f"bench_{os.getpid()}.{case['output_format']}")
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    # Clips normally exist already (the suite generates them); if one had to
+    # be made here its CPU is left out by taking the delta
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    # Only passed when set, so reports can be compared with older engines
+    extra = {k: case[k] for k, v in _AXIS_DEFAULTS.items() if case.get(k, v) != v}
+    success, plan_text = engine.concat_videos(
+        clips,
+        output_path,
+        case["output_format"],
+        case["transition"],
+        0.5,
+        case["concat_mode"],
+        **extra,
+    )
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    cpu = (
+        (after.ru_utime - before.ru_utime)
+        + (after.ru_stime - before.ru_stime)
+        + (self_after.ru_utime - self_before.ru_utime)
+        + (self_after.ru_stime - self_before.ru_stime)
+    )
+    frames = count_frames(output_path) if success else 0
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS. It is a lifetime
+    # peak, so the clips must not be generated in this process; the engine
+    # itself (probe results, frame buffers) counts as well as its ffmpegs.
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    peak_rss = max(after.ru_maxrss, self_after.ru_maxrss) * rss_scale
+    return {
+        "case": case,
+        "id": case_id(case),
+        "success": bool(success),
+        "plan": plan_text.splitlines()[0] if plan_text else "",
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "peak_rss_bytes": peak_rss,
+        "output_frames": frames,
+        "frames_per_second": round(frames / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+def iter_cases(matrix):
+    keys = sorted(matrix)
+    for values in itertools.product(*(matrix[k] for k in keys)):
+        case = dict(zip(keys, values))
+        # gif carries no audio and is always re-encoded; only one mode needed
+        if case["output_format"] == "gif" and (
+            case["audio"] or case["concat_mode"] != "auto"
+        ):
+            continue
+        yield case
+
+
+def run_suite(args):
+    matrix = dict(_FULL_MATRIX if args.full else _QUICK_MATRIX)
+    if args.formats:
+        matrix["output_format"] = args.formats.split(",")
+    if args.engines:
+        matrix["encode_engine"] = args.engines.split(",")
+    if args.profiles:
+        matrix["encoder_profile"] = args.profiles.split(",")
+    if args.duration:
+        matrix["duration"] = [args.duration]
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    results = []
+    cases = list(iter_cases(matrix))
+    media_dir = os.path.join(args.work_dir, "media")
+    os.makedirs(media_dir, exist_ok=True)
+    for n, case in enumerate(cases, 1):
+        # Clips are made here, outside the case process, so their encodes
+        # never show up in its peak RSS
+        for spec in clip_specs(case):
+            make_clip(media_dir, spec)
+        # A fresh interpreter per case keeps rusage and caches separate
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)]
+            + ["--work-dir", args.work_dir],
+            capture_output=True,
+            text=True,
+        )
+        lines = proc.stdout.strip().splitlines()
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            result = {"case": case, "id": case_id(case), "success": False}
+            result["error"] = proc.stderr.strip()[-2000:]
+        results.append(result)
+        print(
+            f"[{n}/{len(cases)}] {result['id']}: "
+            + (
+                f"{result['wall_seconds']}s wall, {result['cpu_seconds']}s cpu, "
+                f"{result['frames_per_second']} fps"
+                if result.get("success")
+                else "FAILED"
+            ),
+            file=sys.stderr,
+        )
+
+    add_engine_speedups(results)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "ffmpeg": ffmpeg_version(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    return 0 if all(r.get("success") for r in results) else 1
+
+
+def add_engine_speedups(results):
+    # Real speedup of each non-serial engine: wall time of the same case
+    # with the serial engine over its own. The engine's plan line only
+    # knows how much its processes overlapped, not what serial would take.
+    by_id = {r["id"]: r for r in results}
+    for result in results:
+        case = result["case"]
+        if case.get("encode_engine", "serial") == "serial" or not result.get("success"):
+            continue
+        serial = by_id.get(case_id(dict(case, encode_engine="serial")))
+        if not serial or not serial.get("success") or not result["wall_seconds"]:
+            continue
+        result["speedup_vs_serial"] = round(
+            serial["wall_seconds"] / result["wall_seconds"], 2
+        )
+        print(
+            f"{case['encode_engine']} vs serial: x{result['speedup_vs_serial']} {result['id']}",
+            file=sys.stderr,
+        )
+
+
+def ffmpeg_version():
+    try:
+        out = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
+        return out.stdout.splitlines()[0]
+    except (OSError, IndexError):
+        return None
+
+
+def compare(old_path, new_path, threshold):
+    # Ratio new/old per case; exit status 1 when any case slowed down by
+    # more than threshold or stopped succeeding
+    with open(old_path, encoding="utf-8") as f:
+        old = {r["id"]: r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = {r["id"]: r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for cid in sorted(set(old) & set(new)):
+        a, b = old[cid], new[cid]
+        if a.get("success") and not b.get("success"):
+            print(f"BROKEN   {cid}")
+            regressions += 1
+            continue
+        if not (a.get("success") and b.get("success")) or not a["wall_seconds"]:
+            continue
+        ratio = b["wall_seconds"] / a["wall_seconds"]
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "SLOWER"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(
+            f"{status:8} {cid}: wall {a['wall_seconds']}s -> {b['wall_seconds']}s "
+            f"(x{ratio:.2f}), cpu {a['cpu_seconds']}s -> {b['cpu_seconds']}s, "
+            f"rss {a['peak_rss_bytes'] // 1048576}MB -> {b['peak_rss_bytes'] // 1048576}MB"
+        )
+    for cid in sorted(set(old) ^ set(new)):
+        print(f"only in {'old' if cid in old else 'new'}: {cid}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concatenation engine benchmark")
+    parser.add_argument("--output", default="bench_concat.json")
+    parser.add_argument(
+        "--work-dir", default=os.path.join(os.getcwd(), ".bench_concat")
+    )
+    parser.add_argument("--full", action="store_true", help="run the whole matrix")
+    parser.add_argument("--formats", help="comma separated output formats")
+    parser.add_argument("--engines", help="comma separated encode engines")
+    parser.add_argument("--profiles", help="comma separated encoder profiles")
+    parser.add_argument("--duration", type=float, help="clip length in seconds")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+    if args.case:
+        # Child mode: engine logs go to stderr, the result is the last stdout line
+        real_stdout = sys.stdout
+        sys.stdout = sys.stderr
+        result = run_case(json.loads(args.case), args.work_dir)
+        sys.stdout = real_stdout
+        print(json.dumps(result))
+        return 0
+    return run_suite(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
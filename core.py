@@ -1,3 +1,85 @@
+from .state_store import IteratorStateManager, create_state_store
+
 # Global state to store the current iteration index for each loop_id
-_ITERATOR_CORE_STATE = {}
-_LAST_PROMPT_ID = {}
+# (backend chosen by COMFY_AUTOMATION_STATE_BACKEND, see state_store.py)
+_ITERATOR_CORE_STATE = IteratorStateManager(create_state_store())
+
+# Running output of VideoAppend for each iterator_id
+_VIDEO_APPEND_STATE = {}
+
+
+def current_prompt_id():
+    # Id of the prompt the executor is running, None outside ComfyUI
+    try:
+        import server
+
+        return server.PromptServer.instance.last_prompt_id
+    except (ImportError, AttributeError):
+        return None
+
+
+def get_iterator_index(iterator_id):
+    return _ITERATOR_CORE_STATE.get_index(iterator_id)
+
+
+def set_iterator_index(iterator_id, index, prompt_id=None):
+    _ITERATOR_CORE_STATE.set_index(iterator_id, index, prompt_id)
+
+
+def set_iterator_total(iterator_id, total, step=None, shared=False):
+    _ITERATOR_CORE_STATE.set_total(iterator_id, total, step, shared)
+
+
+def set_completed_indices(iterator_id, indices):
+    _ITERATOR_CORE_STATE.set_completed(iterator_id, indices)
+
+
+def is_shared_iterator(iterator_id):
+    return _ITERATOR_CORE_STATE.get_record(iterator_id).get("shared", False)
+
+
+def advance_iterator(iterator_id, index=None, step=None, prompt_id=None, lookahead=1):
+    # Returns (next_index, advanced, to_queue); a second advance from the
+    # same prompt_id leaves the index alone and queues nothing
+    return _ITERATOR_CORE_STATE.advance(iterator_id, index, step, prompt_id, lookahead)
+
+
+def resolve_index(iterator_id, bound_index):
+    # Prompts queued by the requeue planner carry their item index
+    if bound_index is not None and bound_index >= 0:
+        return bound_index
+    return get_iterator_index(iterator_id)
+
+
+# Shared work claims, opened the first time a list runs with shared_work
+_WORK_CLAIMS = None
+
+
+def _work_claims():
+    global _WORK_CLAIMS
+    if _WORK_CLAIMS is None:
+        from .work_claims import create_work_claims
+
+        _WORK_CLAIMS = create_work_claims()
+    return _WORK_CLAIMS
+
+
+def claim_iterator_index(iterator_id, total, step=1, reset=False):
+    # Returns (index, remaining) claimed for this worker, or None when every
+    # index is done or held by another worker's live lease
+    if reset:
+        _work_claims().reset(iterator_id)
+    return _work_claims().claim(iterator_id, total, step)
+
+
+def next_claim_expiry(iterator_id, total, step=1):
+    # When the first lease of another worker runs out, None once every
+    # index is done
+    return _work_claims().next_expiry(iterator_id, total, step)
+
+
+def complete_iterator_claims(iterator_id):
+    # Number of open claims of this worker marked done (0 when not sharing)
+    if _WORK_CLAIMS is None:
+        return 0
+    return _WORK_CLAIMS.complete(iterator_id)
@@ -0,0 +1,189 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Leveled logging for messages that run on every prompt (IS_CHANGED, per
+# execution chatter); COMFY_AUTOMATION_LOG_LEVEL=DEBUG brings them back
+logger = logging.getLogger("ComfyUI-Automation")
+_LOG_LEVEL = (os.environ.get("COMFY_AUTOMATION_LOG_LEVEL") or "INFO").strip().upper()
+try:
+    logger.setLevel(int(_LOG_LEVEL) if _LOG_LEVEL.isdigit() else _LOG_LEVEL)
+except ValueError:
+    # A typo in the variable must not keep the whole package from loading
+    logger.setLevel(logging.INFO)
+    logger.warning(f"Unknown COMFY_AUTOMATION_LOG_LEVEL '{_LOG_LEVEL}', using INFO")
+
+# Upper bucket bounds in seconds: 1 ms doubling up to ~2.3 hours, then +inf
+_BUCKETS = [0.001 * 2**i for i in range(24)]
+
+# Keys kept per metric (iterator ids); the least recently updated go first
+_MAX_KEYS = int(os.environ.get("COMFY_AUTOMATION_METRICS_MAX_KEYS", "256"))
+
+METRICS_ROUTE = "/automation/metrics"
+
+
+class Histogram:
+    # Fixed exponential buckets plus count/sum/min/max, so memory stays the
+    # same however many samples come in; percentiles are bucket bounds
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def observe(self, value):
+        i = 0
+        while i < len(_BUCKETS) and value > _BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+
+    def _percentile(self, q):
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(_BUCKETS[i], self.max) if i < len(_BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.total / self.count, 6),
+            "min": round(self.min, 6),
+            "max": round(self.max, 6),
+            "last": round(self.last, 6),
+            "p50": round(self._percentile(0.5), 6),
+            "p90": round(self._percentile(0.9), 6),
+            "p99": round(self._percentile(0.99), 6),
+        }
+
+
+class MetricsRegistry:
+    # metric name -> key -> Histogram. Metrics in use:
+    #   iteration_latency: per iterator_id, time between consecutive signals
+    #   queue_gap: per iterator_id, signal until the next iteration starts
+    #   concat_stage: per stage (resolve, probe, encode, save, append)
+
+    def __init__(self, max_keys=_MAX_KEYS):
+        self.max_keys = max_keys
+        self._metrics = {}
+        self._last_signal = {}
+        # Iterators whose next iteration already started since the last signal
+        self._started = set()
+        self._lock = threading.Lock()
+
+    def observe(self, name, key, seconds):
+        with self._lock:
+            hists = self._metrics.setdefault(name, OrderedDict())
+            hist = hists.pop(key, None) or Histogram()
+            hists[key] = hist
+            hist.observe(seconds)
+            while len(hists) > self.max_keys:
+                hists.popitem(last=False)
+
+    def record_signal(self, iterator_id):
+        now = time.monotonic()
+        with self._lock:
+            previous = self._last_signal.pop(iterator_id, None)
+            self._last_signal[iterator_id] = now
+            self._started.discard(iterator_id)
+            while len(self._last_signal) > self.max_keys:
+                self._started.discard(
+                    self._last_signal.pop(next(iter(self._last_signal)))
+                )
+        if previous is not None:
+            self.observe("iteration_latency", iterator_id, now - previous)
+
+    def record_iteration_start(self, iterator_id):
+        # Only the first start after a signal counts; re-executions of the
+        # same iteration (cache misses, retries) are not a queue gap
+        with self._lock:
+            signalled = self._last_signal.get(iterator_id)
+            pending = signalled is not None and iterator_id not in self._started
+            if pending:
+                self._started.add(iterator_id)
+        if pending:
+            self.observe("queue_gap", iterator_id, time.monotonic() - signalled)
+
+    def end_iterations(self, iterator_id):
+        # A finished loop; the next run's first signal starts afresh
+        with self._lock:
+            self._last_signal.pop(iterator_id, None)
+            self._started.discard(iterator_id)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {key: hist.snapshot() for key, hist in hists.items()}
+                for name, hists in self._metrics.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+            self._last_signal.clear()
+            self._started.clear()
+
+
+_METRICS = MetricsRegistry()
+
+
+def record_stage(stage, seconds):
+    _METRICS.observe("concat_stage", stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_signal(iterator_id):
+    _METRICS.record_signal(iterator_id)
+
+
+def record_iteration_start(iterator_id):
+    _METRICS.record_iteration_start(iterator_id)
+
+
+def end_iterations(iterator_id):
+    _METRICS.end_iterations(iterator_id)
+
+
+def metrics_snapshot():
+    return _METRICS.snapshot()
+
+
+def register_routes(prompt_server):
+    # GET /automation/metrics returns every histogram as JSON; ?metric=
+    # narrows it to one metric. Any object with an aiohttp RouteTableDef in
+    # .routes works, so a stand-in server can be used outside ComfyUI.
+    @prompt_server.routes.get(METRICS_ROUTE)
+    async def get_metrics(request):
+        from aiohttp import web
+
+        data = metrics_snapshot()
+        metric = request.rel_url.query.get("metric")
+        if metric:
+            data = {metric: data.get(metric, {})}
+        return web.json_response(data)
+
+    return get_metrics
@@ -0,0 +1,21 @@
+def stack_images(images):
+    # One IMAGE batch from single images (or batches); images that differ
+    # in size are resized to the first one, like ComfyUI's Batch Images
+    images = [img for img in images if img is not None]
+    if not images:
+        return None
+    if len(images) == 1:
+        return images[0]
+
+    import torch
+    import comfy.utils
+
+    height, width = images[0].shape[1:3]
+    resized = []
+    for img in images:
+        if img.shape[1:3] != (height, width):
+            img = comfy.utils.common_upscale(
+                img.movedim(-1, 1), width, height, "bilinear", "center"
+            ).movedim(1, -1)
+        resized.append(img)
+    return torch.cat(resized, dim=0)
@@ -1,4 +1,12 @@
-from ...core import _ITERATOR_CORE_STATE
+from ...core import (
+    claim_iterator_index,
+    resolve_index,
+    set_iterator_index,
+    set_iterator_total,
+)
+from ...metrics import record_iteration_start
+from ...work_claims import execution_blocker
+from .list_position import retry_after_leases
 
 
 class IteratorCounter:
@@ -15,6 +23,14 @@ class IteratorCounter:
                 "step": ("INT", {"default": 1, "min": 1, "max": 0xFFFFFFFFFFFFFFFF}),
                 "reset": ("BOOLEAN", {"default": False}),
             },
+            "optional": {
+                "shared_work": ("BOOLEAN", {"default": False}),
+                "bound_index": ("INT", {"default": -1, "min": -1, "forceInput": True}),
+            },
+            "hidden": {
+                "prompt": "PROMPT",
+                "extra_pnginfo": "EXTRA_PNGINFO",
+            },
         }
 
     RETURN_TYPES = ("INT", "BOOLEAN")
@@ -23,17 +39,48 @@ class IteratorCounter:
     CATEGORY = "Iterator"
 
     @classmethod
-    def IS_CHANGED(s, iterator_id, **kwargs):
-        return _ITERATOR_CORE_STATE.get(iterator_id, 0)
-
-    def increment(self, iterator_id, start, max_iterations, step, reset):
-        global _ITERATOR_CORE_STATE
+    def IS_CHANGED(s, iterator_id, bound_index=-1, shared_work=False, **kwargs):
+        if shared_work:
+            # The claimed index is only known once the node runs
+            return float("NaN")
+        return resolve_index(iterator_id, bound_index)
 
-        if reset:
-            _ITERATOR_CORE_STATE[iterator_id] = 0
+    def increment(
+        self,
+        iterator_id,
+        start,
+        max_iterations,
+        step,
+        reset,
+        shared_work=False,
+        bound_index=-1,
+        prompt=None,
+        extra_pnginfo=None,
+    ):
+        record_iteration_start(iterator_id)
+        if reset and bound_index < 0:
+            set_iterator_index(iterator_id, 0)
+        set_iterator_total(iterator_id, max_iterations, shared=shared_work)
 
-        idx = _ITERATOR_CORE_STATE.get(iterator_id, 0)
+        if shared_work:
+            # Each worker claims the next iteration no other worker holds
+            claim = claim_iterator_index(iterator_id, max_iterations, 1, reset)
+            if claim is None:
+                retry_after_leases(
+                    "IteratorCounter",
+                    iterator_id,
+                    max_iterations,
+                    1,
+                    prompt,
+                    extra_pnginfo,
+                )
+                blocker = execution_blocker()
+                return (blocker, blocker)
+            idx, remaining = claim
+            is_finished = remaining == 0
+        else:
+            idx = resolve_index(iterator_id, bound_index)
+            is_finished = (idx + 1) >= max_iterations
         current_count = start + (idx * step)
-        is_finished = (idx + 1) >= max_iterations
 
         return (current_count, is_finished)
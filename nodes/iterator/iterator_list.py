@@ -1,4 +1,8 @@
-from ...core import _ITERATOR_CORE_STATE
+from ...core import resolve_index
+from ...metrics import logger
+from ...work_claims import execution_blocker
+from .batch_utils import stack_images
+from .list_position import output_key, select_position
 
 
 class IteratorList:
@@ -17,25 +21,71 @@ class IteratorList:
                 "item5": ("ITERATOR_ITEM",),
                 "item6": ("ITERATOR_ITEM",),
                 "trigger": ("*",),
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 4096}),
+                "shared_work": ("BOOLEAN", {"default": False}),
+                "skip_completed": ("BOOLEAN", {"default": False}),
+                "bound_index": ("INT", {"default": -1, "min": -1, "forceInput": True}),
+            },
+            "hidden": {
+                "prompt": "PROMPT",
+                "extra_pnginfo": "EXTRA_PNGINFO",
             },
         }
 
-    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "BOOLEAN")
-    RETURN_NAMES = ("IMAGE", "AUDIO_TEXT", "VIDEO_PROMPT", "IS_FINISHED")
+    RETURN_TYPES = (
+        "IMAGE",
+        "STRING",
+        "STRING",
+        "BOOLEAN",
+        "STRING",
+        "STRING",
+        "STRING",
+    )
+    RETURN_NAMES = (
+        "IMAGE",
+        "AUDIO_TEXT",
+        "VIDEO_PROMPT",
+        "IS_FINISHED",
+        "AUDIO_TEXT_LIST",
+        "VIDEO_PROMPT_LIST",
+        "OUTPUT_KEY",
+    )
+    OUTPUT_IS_LIST = (False, False, False, False, True, True, False)
     FUNCTION = "iterate"
     CATEGORY = "Iterator"
 
     @classmethod
-    def IS_CHANGED(s, iterator_id, **kwargs):
-        from ...core import _ITERATOR_CORE_STATE
-
-        val = _ITERATOR_CORE_STATE.get(iterator_id, 0)
-        print(f"[IteratorList] IS_CHANGED called for {iterator_id}. State: {val}")
+    def IS_CHANGED(
+        s,
+        iterator_id,
+        bound_index=-1,
+        shared_work=False,
+        skip_completed=False,
+        **kwargs,
+    ):
+        if shared_work or (skip_completed and bound_index < 0):
+            # The index (claimed, or past completed items) is only known
+            # once the node runs
+            return float("NaN")
+        val = resolve_index(iterator_id, bound_index)
+        # Runs on every prompt validation, so only at debug level
+        logger.debug(
+            f"[IteratorList] IS_CHANGED called for {iterator_id}. State: {val}"
+        )
         return val
 
-    def iterate(self, iterator_id, reset, trigger=None, **kwargs):
-        global _ITERATOR_CORE_STATE
-        print(f"[IteratorList] Iterate called for {iterator_id}. Reset: {reset}")
+    def iterate(
+        self,
+        iterator_id,
+        reset,
+        trigger=None,
+        batch_size=1,
+        shared_work=False,
+        skip_completed=False,
+        bound_index=-1,
+        **kwargs,
+    ):
+        logger.debug(f"[IteratorList] Iterate called for {iterator_id}. Reset: {reset}")
 
         items = []
         for i in range(1, 7):
@@ -43,29 +93,42 @@ class IteratorList:
             if it:
                 items.append(it)
 
-        if reset:
-            _ITERATOR_CORE_STATE[iterator_id] = 0
-
         if not items:
-            return (None, "", "", True)
-
-        idx = _ITERATOR_CORE_STATE.get(iterator_id, 0)
-        print(f"[IteratorList] Processing {iterator_id}. Index: {idx} / {len(items)}")
-
-        # Ensure index is within bounds (can happen if items list changed)
-        if idx >= len(items):
-            # If we are past the end, we are finished.
-            # Do NOT reset here automatically, otherwise we loop forever.
-            # We will cap it at the last item for safety, but is_finished will be True.
-            idx = len(items) - 1
-            if idx < 0:
-                idx = 0  # Handle empty list case safely
+            return (None, "", "", True, [""], [""], "")
 
-        item = items[idx]
-        image = item.get("image")
-        audio_text = item.get("audio_text", "")
-        video_prompt = item.get("video_prompt", "")
+        position = select_position(
+            "IteratorList",
+            iterator_id,
+            items,
+            batch_size,
+            reset,
+            bound_index,
+            shared_work,
+            skip_completed,
+            kwargs.get("prompt"),
+            kwargs.get("extra_pnginfo"),
+        )
+        if position is None:
+            blocker = execution_blocker()
+            return (blocker,) * 4 + ([blocker], [blocker], blocker)
+        idx, is_finished = position
+        logger.info(
+            f"[IteratorList] Processing {iterator_id}. Index: {idx} / {len(items)}"
+        )
 
-        is_finished = (idx + 1) >= len(items)
+        # The next batch_size items (fewer at the end of the list); the
+        # single STRING outputs carry the first item of the batch
+        batch = items[idx : idx + batch_size]
+        image = stack_images([item.get("image") for item in batch])
+        audio_texts = [item.get("audio_text", "") for item in batch]
+        video_prompts = [item.get("video_prompt", "") for item in batch]
 
-        return (image, audio_text, video_prompt, is_finished)
+        return (
+            image,
+            audio_texts[0],
+            video_prompts[0],
+            is_finished,
+            audio_texts,
+            video_prompts,
+            output_key(iterator_id, idx, batch[0]),
+        )
@@ -0,0 +1,137 @@
+from ...core import resolve_index
+from ...metrics import logger
+from ...work_claims import execution_blocker
+from .manifest_source import (
+    get_image_loader,
+    load_items,
+    resolve_source,
+    source_identity,
+)
+from .batch_utils import stack_images
+from .list_position import output_key, select_position
+
+
+class IteratorManifestList:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "iterator_id": ("STRING", {"default": "default_iterator"}),
+                "source": ("STRING", {"default": ""}),
+                "reset": ("BOOLEAN", {"default": False}),
+            },
+            "optional": {
+                "trigger": ("*",),
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 4096}),
+                "shared_work": ("BOOLEAN", {"default": False}),
+                "skip_completed": ("BOOLEAN", {"default": False}),
+                "bound_index": ("INT", {"default": -1, "min": -1, "forceInput": True}),
+            },
+            "hidden": {
+                "prompt": "PROMPT",
+                "extra_pnginfo": "EXTRA_PNGINFO",
+            },
+        }
+
+    RETURN_TYPES = (
+        "IMAGE",
+        "STRING",
+        "STRING",
+        "BOOLEAN",
+        "STRING",
+        "STRING",
+        "STRING",
+    )
+    RETURN_NAMES = (
+        "IMAGE",
+        "AUDIO_TEXT",
+        "VIDEO_PROMPT",
+        "IS_FINISHED",
+        "AUDIO_TEXT_LIST",
+        "VIDEO_PROMPT_LIST",
+        "OUTPUT_KEY",
+    )
+    OUTPUT_IS_LIST = (False, False, False, False, True, True, False)
+    FUNCTION = "iterate"
+    CATEGORY = "Iterator"
+
+    @classmethod
+    def IS_CHANGED(
+        s,
+        iterator_id,
+        source,
+        bound_index=-1,
+        shared_work=False,
+        skip_completed=False,
+        **kwargs,
+    ):
+        if shared_work or (skip_completed and bound_index < 0):
+            # The index (claimed, or past completed items) is only known
+            # once the node runs
+            return float("NaN")
+        # Re-run when the position moves or the manifest/directory changes
+        identity = source_identity(resolve_source(source))
+        return f"{resolve_index(iterator_id, bound_index)}:{identity}"
+
+    def iterate(
+        self,
+        iterator_id,
+        source,
+        reset,
+        trigger=None,
+        batch_size=1,
+        shared_work=False,
+        skip_completed=False,
+        bound_index=-1,
+        prompt=None,
+        extra_pnginfo=None,
+    ):
+        items = load_items(resolve_source(source))
+        if not items:
+            return (None, "", "", True, [""], [""], "")
+
+        position = select_position(
+            "IteratorManifest",
+            iterator_id,
+            items,
+            batch_size,
+            reset,
+            bound_index,
+            shared_work,
+            skip_completed,
+            prompt,
+            extra_pnginfo,
+        )
+        if position is None:
+            blocker = execution_blocker()
+            return (blocker,) * 4 + ([blocker], [blocker], blocker)
+        idx, is_finished = position
+        logger.info(
+            f"[IteratorManifest] Processing {iterator_id}. Index: {idx} / {len(items)}"
+        )
+
+        # The next batch_size items (fewer at the end of the list); the
+        # single STRING outputs carry the first item of the batch
+        batch = items[idx : idx + batch_size]
+        loader = get_image_loader()
+        loader.ensure_capacity(2 * batch_size)
+        image = stack_images(
+            [loader.get(item["image"]) for item in batch if item["image"]]
+        )
+        audio_texts = [item["audio_text"] for item in batch]
+        video_prompts = [item["video_prompt"] for item in batch]
+
+        # Decode the next batch while this one is being processed
+        for item in items[idx + batch_size : idx + 2 * batch_size]:
+            if item["image"]:
+                loader.prefetch(item["image"])
+
+        return (
+            image,
+            audio_texts[0],
+            video_prompts[0],
+            is_finished,
+            audio_texts,
+            video_prompts,
+            output_key(iterator_id, idx, batch[0]),
+        )
@@ -1,4 +1,13 @@
-from ...core import _ITERATOR_CORE_STATE, _LAST_PROMPT_ID
+from ...core import (
+    advance_iterator,
+    complete_iterator_claims,
+    current_prompt_id,
+    is_shared_iterator,
+    resolve_index,
+    set_iterator_index,
+)
+from ...metrics import end_iterations, logger, record_signal
+from .requeue_planner import queue_iterations
 
 
 class IteratorSignal:
@@ -12,6 +21,8 @@ class IteratorSignal:
             },
             "optional": {
                 "is_finished": ("BOOLEAN", {"default": False}),
+                "lookahead": ("INT", {"default": 1, "min": 1, "max": 64}),
+                "bound_index": ("INT", {"default": -1, "min": -1, "forceInput": True}),
             },
             "hidden": {
                 "prompt": "PROMPT",
@@ -36,13 +47,13 @@ class IteratorSignal:
         iterator_id,
         active,
         is_finished=False,
+        lookahead=1,
+        bound_index=-1,
         prompt=None,
         extra_pnginfo=None,
         unique_id=None,
     ):
-        global _ITERATOR_CORE_STATE, _LAST_PROMPT_ID
-
-        print(
+        logger.debug(
             f"[IteratorSignal] Executing for {iterator_id}. Active: {active}, Finished: {is_finished}"
         )
 
@@ -51,58 +62,60 @@ class IteratorSignal:
 
         if active and has_image:
             # 1. Advance the state
-            current_idx = _ITERATOR_CORE_STATE.get(iterator_id, 0)
+            # Keyed on the running prompt, so a duplicate signal from the same
+            # prompt neither advances twice nor queues a second iteration
+            prompt_id = current_prompt_id()
+            record_signal(iterator_id)
+
+            # In shared work mode the claim is the position: mark it done and
+            # queue one more run, which claims whatever is left by then
+            if is_shared_iterator(iterator_id):
+                completed = complete_iterator_claims(iterator_id)
+                logger.info(
+                    f"[Iterator] Completed {completed} claim(s) on {iterator_id}"
+                )
+                if completed and not is_finished and prompt and unique_id:
+                    try:
+                        queue_iterations(prompt, extra_pnginfo, iterator_id, [None])
+                    except Exception as e:
+                        logger.warning(f"[IteratorSignal] Failed to auto-queue: {e}")
+                if is_finished:
+                    end_iterations(iterator_id)
+                return (has_image, image)
 
             # If we are NOT finished, we prepare for the next item
             if not is_finished:
-                _ITERATOR_CORE_STATE[iterator_id] = current_idx + 1
-                print(
-                    f"[Iterator] Advanced {iterator_id} to index {_ITERATOR_CORE_STATE[iterator_id]}"
+                index = resolve_index(iterator_id, bound_index)
+                new_idx, advanced, to_queue = advance_iterator(
+                    iterator_id, index, prompt_id=prompt_id, lookahead=lookahead
                 )
+                if advanced:
+                    logger.info(f"[Iterator] Advanced {iterator_id} to index {new_idx}")
+                else:
+                    logger.info(
+                        f"[Iterator] {iterator_id} already advanced to index {new_idx} by prompt {prompt_id}"
+                    )
 
                 # 2. Trigger re-queue if available
-                # We need to re-queue the exact same workflow.
-                if prompt and unique_id:
-                    import server
-                    import nodes
-                    import uuid
-
-                    # 2.1 Identify output nodes to execute
-                    # We want to re-execute everything that is an output (SaveImage, Preview, etc.)
-                    # not just the Signal node.
-                    output_node_ids = []
-                    for nid, n_info in prompt.items():
-                        cls_type = n_info.get("class_type")
-                        if cls_type in nodes.NODE_CLASS_MAPPINGS:
-                            cls = nodes.NODE_CLASS_MAPPINGS[cls_type]
-                            if getattr(cls, "OUTPUT_NODE", False):
-                                output_node_ids.append(nid)
-
-                    # 2.2 Prepare execution payload
-                    new_prompt_id = uuid.uuid4().hex
-                    new_extra_data = {"extra_pnginfo": extra_pnginfo}
-
+                # We need to re-queue the exact same workflow, bound to the
+                # index of each upcoming item. Up to `lookahead` iterations
+                # stay queued, so the queue never drains between items.
+                if to_queue and prompt and unique_id:
                     try:
-                        p = server.PromptServer.instance
-                        # Tuple: (number, prompt_id, prompt, extra_data, outputs_to_execute, sensitive_data)
-                        p.prompt_queue.put(
-                            (
-                                0,
-                                new_prompt_id,
-                                prompt,
-                                new_extra_data,
-                                output_node_ids,
-                                {},
-                            )
+                        queued = queue_iterations(
+                            prompt, extra_pnginfo, iterator_id, to_queue
                         )
-                        print(
-                            f"[IteratorSignal] Automatically queued next iteration for {iterator_id} (Prompt ID: {new_prompt_id})"
+                        logger.info(
+                            f"[IteratorSignal] Automatically queued iterations {to_queue} for {iterator_id} (Prompt IDs: {', '.join(queued)})"
                         )
                     except Exception as e:
-                        print(f"[IteratorSignal] Failed to auto-queue: {e}")
+                        logger.warning(f"[IteratorSignal] Failed to auto-queue: {e}")
 
             else:
-                print(f"[Iterator] Iterator {iterator_id} finished. Resetting state.")
-                _ITERATOR_CORE_STATE[iterator_id] = 0
+                logger.info(
+                    f"[Iterator] Iterator {iterator_id} finished. Resetting state."
+                )
+                end_iterations(iterator_id)
+                set_iterator_index(iterator_id, 0, prompt_id)
 
         return (has_image, image)
@@ -0,0 +1,78 @@
+from ...core import resolve_index, set_iterator_index, set_iterator_total
+from ...metrics import logger, record_iteration_start
+from .sweep_axes import SWEEP_ORDERS, decode_index, order_axes, parse_axes, sweep_size
+
+
+class IteratorSweep:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "iterator_id": ("STRING", {"default": "sweep_iterator"}),
+                "axes": (
+                    "STRING",
+                    {"multiline": True, "default": "seed: 1, 2, 3\ncfg: 5.0..8.0:1.5"},
+                ),
+                "order": (SWEEP_ORDERS, {"default": "first_axis_slowest"}),
+                "reset": ("BOOLEAN", {"default": False}),
+            },
+            "optional": {
+                "slow_axes": ("STRING", {"default": ""}),
+                "bound_index": ("INT", {"default": -1, "min": -1, "forceInput": True}),
+            },
+        }
+
+    RETURN_TYPES = ("SWEEP_PARAMS", "STRING", "INT", "INT", "BOOLEAN")
+    RETURN_NAMES = ("params", "label", "index", "total", "is_finished")
+    FUNCTION = "sweep"
+    CATEGORY = "Iterator"
+
+    @classmethod
+    def IS_CHANGED(s, iterator_id, bound_index=-1, **kwargs):
+        return resolve_index(iterator_id, bound_index)
+
+    def sweep(self, iterator_id, axes, order, reset, slow_axes="", bound_index=-1):
+        record_iteration_start(iterator_id)
+        if reset and bound_index < 0:
+            set_iterator_index(iterator_id, 0)
+
+        # The slowest axes change least often, so nodes fed only by them
+        # keep hitting ComfyUI's cache between consecutive points
+        ordered = order_axes(parse_axes(axes), order, slow_axes)
+        total = sweep_size(ordered)
+        set_iterator_total(iterator_id, total)
+
+        idx = min(resolve_index(iterator_id, bound_index), total - 1)
+        params = decode_index(ordered, idx, serpentine=order == "serpentine")
+        label = ", ".join(f"{name}={value}" for name, value in params.items())
+        logger.info(f"[IteratorSweep] {iterator_id} {idx + 1} / {total}: {label}")
+
+        return (params, label, idx, total, (idx + 1) >= total)
+
+
+class SweepParam:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "params": ("SWEEP_PARAMS",),
+                "name": ("STRING", {"default": "seed"}),
+            },
+        }
+
+    RETURN_TYPES = ("INT", "FLOAT", "STRING")
+    RETURN_NAMES = ("INT", "FLOAT", "STRING")
+    FUNCTION = "extract"
+    CATEGORY = "Iterator"
+
+    def extract(self, params, name):
+        if name not in params:
+            raise ValueError(f"Sweep has no axis '{name}' (axes: {', '.join(params)})")
+        value = params[name]
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = 0.0
+        # Large seeds do not survive a round trip through float
+        as_int = value if isinstance(value, int) else int(number)
+        return (as_int, number, str(value))
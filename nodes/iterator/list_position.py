@@ -0,0 +1,151 @@
+import time
+import hashlib
+import folder_paths
+from ..video_concatenation.path_index import get_path_index
+from ...metrics import logger, record_iteration_start
+from ...core import (
+    claim_iterator_index,
+    complete_iterator_claims,
+    next_claim_expiry,
+    resolve_index,
+    set_completed_indices,
+    set_iterator_index,
+    set_iterator_total,
+)
+
+from .requeue_planner import queue_iteration_at
+
+_KEY_LENGTH = 16
+
+# Slack after a lease runs out before the retry claims it
+_LEASE_MARGIN_SECONDS = 1.0
+
+
+def output_key(iterator_id, index, item):
+    # Stable per item: same loop, position and prompt text give the same key
+    payload = "\n".join(
+        [
+            iterator_id,
+            str(index),
+            item.get("audio_text", "") or "",
+            item.get("video_prompt", "") or "",
+        ]
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:_KEY_LENGTH]
+
+
+def existing_output_keys():
+    # Key-length prefixes of every file name under the output directory;
+    # an item counts as done once a file name starts with its key
+    index = get_path_index(folder_paths.get_output_directory())
+    index.refresh()
+    return {name[:_KEY_LENGTH] for name in index.file_names()}
+
+
+def completed_indices(iterator_id, items, step):
+    existing = existing_output_keys()
+    return {
+        i
+        for i in range(0, len(items), step)
+        if output_key(iterator_id, i, items[i]) in existing
+    }
+
+
+def retry_after_leases(tag, iterator_id, total, step, prompt, extra_pnginfo):
+    # Nothing could be claimed. Either every index is done, or the rest is
+    # leased by other workers; then this run stops (instead of holding the
+    # executor) and the prompt is queued again for when the first lease
+    # runs out, so an index whose worker died still gets done
+    expiry = next_claim_expiry(iterator_id, total, step)
+    if expiry is None:
+        logger.info(f"[{tag}] All items of {iterator_id} are done")
+        return
+    logger.info(
+        f"[{tag}] Remaining items of {iterator_id} are claimed by other workers"
+    )
+    if prompt and queue_iteration_at(
+        expiry + _LEASE_MARGIN_SECONDS, prompt, extra_pnginfo, iterator_id
+    ):
+        logger.info(
+            f"[{tag}] Checking {iterator_id} again in {max(0.0, expiry - time.time()):.0f}s"
+        )
+
+
+def select_position(
+    tag,
+    iterator_id,
+    items,
+    batch_size,
+    reset,
+    bound_index,
+    shared_work=False,
+    skip_completed=False,
+    prompt=None,
+    extra_pnginfo=None,
+):
+    # Picks the index of the batch this execution processes. Returns
+    # (index, is_finished), or None when nothing is left for this run.
+    # prompt/extra_pnginfo let a shared run queue itself again later.
+    total = len(items)
+    record_iteration_start(iterator_id)
+
+    # Iterations queued ahead by the Signal are already bound to an item
+    if reset and bound_index < 0:
+        set_iterator_index(iterator_id, 0)
+
+    # Lets the Signal know how far ahead it may queue and how many
+    # items each execution consumes
+    set_iterator_total(iterator_id, total, batch_size, shared_work)
+
+    completed = set()
+    if skip_completed:
+        completed = completed_indices(iterator_id, items, batch_size)
+        # The Signal leaves these out when it queues ahead
+        set_completed_indices(iterator_id, completed)
+
+    def pending(start):
+        return next(
+            (i for i in range(start, total, batch_size) if i not in completed), None
+        )
+
+    if shared_work:
+        # Each worker claims the next batch no other worker holds
+        claim = claim_iterator_index(iterator_id, total, batch_size, reset)
+        skipped = 0
+        while claim is not None and claim[0] in completed:
+            complete_iterator_claims(iterator_id)
+            skipped += 1
+            claim = claim_iterator_index(iterator_id, total, batch_size)
+        if skipped:
+            logger.info(f"[{tag}] Skipped {skipped} completed batches of {iterator_id}")
+        if claim is None:
+            retry_after_leases(
+                tag, iterator_id, total, batch_size, prompt, extra_pnginfo
+            )
+            return None
+        idx, remaining = claim
+        # Finished only once every other item is done, so this worker keeps
+        # queueing while leases of other workers could still expire
+        return idx, remaining == 0
+
+    idx = resolve_index(iterator_id, bound_index)
+    if completed and bound_index < 0:
+        # Fast-forward over items whose outputs already exist
+        next_idx = pending(idx)
+        if next_idx is None:
+            logger.info(f"[{tag}] All remaining items of {iterator_id} are completed")
+            return None
+        if next_idx != idx:
+            skipped = len([i for i in completed if idx <= i < next_idx])
+            logger.info(f"[{tag}] Skipped {skipped} completed items of {iterator_id}")
+            set_iterator_index(iterator_id, next_idx)
+            idx = next_idx
+
+    # Ensure index is within bounds (can happen if items list changed)
+    if idx >= total:
+        # If we are past the end, we are finished.
+        # Do NOT reset here automatically, otherwise we loop forever.
+        # We will cap it at the last item for safety, but is_finished will be True.
+        idx = total - 1
+
+    return idx, pending(idx + batch_size) is None
@@ -0,0 +1,198 @@
+import os
+import csv
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import folder_paths
+from ...metrics import logger
+from ..video_concatenation.path_utils import natural_sort_key
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+
+# Parsed manifests keyed by (path, size, mtime_ns), newest few only
+_MANIFEST_CACHE = OrderedDict()
+_MANIFEST_CACHE_SIZE = 8
+
+
+def resolve_source(source):
+    # Relative sources are looked up in the ComfyUI input directory
+    source = source.strip() if isinstance(source, str) else ""
+    if source and not os.path.isabs(source):
+        source = os.path.join(folder_paths.get_input_directory(), source)
+    return source
+
+
+def source_identity(source):
+    # Changes whenever the directory listing or the manifest file changes
+    try:
+        st = os.stat(source)
+    except OSError:
+        return None
+    return (os.path.abspath(source), st.st_size, st.st_mtime_ns)
+
+
+def _read_directory(source):
+    names = [
+        name
+        for name in os.listdir(source)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+    return [
+        {"image": os.path.join(source, name), "audio_text": "", "video_prompt": ""}
+        for name in sorted(names, key=natural_sort_key)
+    ]
+
+
+def _read_rows(source):
+    with open(source, "r", encoding="utf-8", newline="") as f:
+        if source.lower().endswith(".csv"):
+            return list(csv.DictReader(f))
+        rows = []
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                logger.warning(
+                    f"[IteratorManifest] Skipping line {line_no} of {source}: {e}"
+                )
+        return rows
+
+
+def _read_manifest(source):
+    # CSV (header row) or JSONL with image / audio_text / video_prompt;
+    # image paths are relative to the manifest's directory
+    base = os.path.dirname(os.path.abspath(source))
+    items = []
+    for row in _read_rows(source):
+        image = (row.get("image") or "").strip()
+        if image and not os.path.isabs(image):
+            image = os.path.join(base, image)
+        items.append(
+            {
+                "image": image or None,
+                "audio_text": row.get("audio_text") or "",
+                "video_prompt": row.get("video_prompt") or "",
+            }
+        )
+    return items
+
+
+def load_items(source):
+    # Item descriptors only, no pixels are decoded here
+    identity = source_identity(source)
+    if identity is None:
+        logger.warning(f"[IteratorManifest] Source not found: {source}")
+        return []
+
+    items = _MANIFEST_CACHE.get(identity)
+    if items is None:
+        if os.path.isdir(source):
+            items = _read_directory(source)
+        else:
+            items = _read_manifest(source)
+        _MANIFEST_CACHE[identity] = items
+        if len(_MANIFEST_CACHE) > _MANIFEST_CACHE_SIZE:
+            _MANIFEST_CACHE.popitem(last=False)
+    else:
+        _MANIFEST_CACHE.move_to_end(identity)
+    return items
+
+
+def decode_image(path):
+    # Same conversion as ComfyUI's LoadImage: [1, H, W, 3] float in 0..1
+    import numpy as np
+    import torch
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        array = np.asarray(img, dtype=np.float32) / 255.0
+    return torch.from_numpy(array)[None,]
+
+
+class LazyImageLoader:
+    # Decodes images on demand and keeps the last few tensors. prefetch()
+    # decodes on a background thread; a get() for a path still in flight
+    # waits for that decode instead of starting a second one.
+
+    def __init__(self, max_items=4):
+        self.min_items = max_items
+        self.max_items = max_items
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def ensure_capacity(self, count):
+        # Room for the current batch plus the prefetched next one. Set per
+        # batch, so a large batch_size doesn't keep its tensors around once
+        # the loop runs smaller batches again.
+        with self._lock:
+            self.max_items = max(self.min_items, count)
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+
+    def _key(self, path):
+        try:
+            return (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+
+    def _store(self, key, image):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._cache[key] = image
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+
+    def _decode(self, key):
+        image = decode_image(key[0])
+        self._store(key, image)
+        return image
+
+    def get(self, path):
+        key = self._key(path)
+        if key is None:
+            logger.warning(f"[IteratorManifest] Image not found: {path}")
+            return None
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+                return image
+            future = self._pending.get(key)
+        if future is not None:
+            image = future.result()
+            if image is not None:
+                return image
+        return self._decode(key)
+
+    def prefetch(self, path):
+        key = self._key(path)
+        if key is None:
+            return
+        with self._lock:
+            if key in self._cache or key in self._pending:
+                return
+            self._pending[key] = self._executor.submit(self._prefetch, key)
+
+    def _prefetch(self, key):
+        try:
+            return self._decode(key)
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            logger.warning(f"[IteratorManifest] Prefetch of {key[0]} failed: {e}")
+            return None
+
+
+_IMAGE_LOADER = LazyImageLoader()
+
+
+def get_image_loader():
+    return _IMAGE_LOADER
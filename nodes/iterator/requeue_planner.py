@@ -0,0 +1,122 @@
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from ...metrics import logger
+
+# Node types that read the loop position and accept a bound_index input
+BOUND_NODE_TYPES = {
+    "IteratorList",
+    "IteratorManifestList",
+    "IteratorCounter",
+    "IteratorSweep",
+    "IteratorSignal",
+}
+
+# Requeues waiting for a point in time, one per iterator_id
+_DEFERRED = {}
+_DEFERRED_LOCK = threading.Lock()
+
+# Output node ids per graph shape (node ids and class types)
+_OUTPUT_NODES_CACHE = OrderedDict()
+_OUTPUT_NODES_CACHE_SIZE = 64
+
+
+def graph_hash(prompt):
+    # Widget values (and injected bound_index inputs) do not change which
+    # nodes are outputs, so every iteration of a loop shares one hash
+    shape = sorted((str(nid), n.get("class_type", "")) for nid, n in prompt.items())
+    return hashlib.sha1(repr(shape).encode("utf-8")).hexdigest()
+
+
+def get_output_nodes(prompt):
+    # We want to re-execute everything that is an output (SaveImage,
+    # Preview, etc.) not just the Signal node
+    key = graph_hash(prompt)
+    output_node_ids = _OUTPUT_NODES_CACHE.get(key)
+    if output_node_ids is not None:
+        _OUTPUT_NODES_CACHE.move_to_end(key)
+        return output_node_ids
+
+    import nodes
+
+    output_node_ids = []
+    for nid, n_info in prompt.items():
+        cls = nodes.NODE_CLASS_MAPPINGS.get(n_info.get("class_type"))
+        if cls is not None and getattr(cls, "OUTPUT_NODE", False):
+            output_node_ids.append(nid)
+
+    _OUTPUT_NODES_CACHE[key] = output_node_ids
+    if len(_OUTPUT_NODES_CACHE) > _OUTPUT_NODES_CACHE_SIZE:
+        _OUTPUT_NODES_CACHE.popitem(last=False)
+    return output_node_ids
+
+
+def bind_prompt(prompt, iterator_id, index):
+    # Copy of the prompt whose iterator nodes for iterator_id read item
+    # index, instead of whatever the shared state holds when they run
+    bound = dict(prompt)
+    for nid, n_info in prompt.items():
+        if n_info.get("class_type") not in BOUND_NODE_TYPES:
+            continue
+        if n_info.get("inputs", {}).get("iterator_id") != iterator_id:
+            continue
+        n_info = dict(n_info)
+        n_info["inputs"] = dict(n_info["inputs"], bound_index=index)
+        bound[nid] = n_info
+    return bound
+
+
+def queue_iterations(prompt, extra_pnginfo, iterator_id, indices):
+    # Queues one prompt per index, in order, behind what is already queued;
+    # an index of None queues the prompt unbound
+    if not indices:
+        return []
+
+    import server
+
+    output_node_ids = get_output_nodes(prompt)
+    new_extra_data = {"extra_pnginfo": extra_pnginfo}
+    p = server.PromptServer.instance
+
+    queued = []
+    for index in indices:
+        new_prompt_id = uuid.uuid4().hex
+        number = p.number
+        p.number += 1
+        # Tuple: (number, prompt_id, prompt, extra_data, outputs_to_execute, sensitive_data)
+        p.prompt_queue.put(
+            (
+                number,
+                new_prompt_id,
+                prompt if index is None else bind_prompt(prompt, iterator_id, index),
+                new_extra_data,
+                output_node_ids,
+                {},
+            )
+        )
+        queued.append(new_prompt_id)
+    return queued
+
+
+def queue_iteration_at(when, prompt, extra_pnginfo, iterator_id):
+    # Queues the prompt unbound once the time.time() value `when` has
+    # passed, from a timer thread so the executor is never held up. Returns
+    # False when a requeue for iterator_id is already waiting.
+    def fire():
+        with _DEFERRED_LOCK:
+            _DEFERRED.pop(iterator_id, None)
+        try:
+            queue_iterations(prompt, extra_pnginfo, iterator_id, [None])
+        except Exception as e:
+            logger.warning(f"[Iterator] Failed to queue a retry for {iterator_id}: {e}")
+
+    with _DEFERRED_LOCK:
+        if iterator_id in _DEFERRED:
+            return False
+        timer = threading.Timer(max(0.0, when - time.time()), fire)
+        timer.daemon = True
+        _DEFERRED[iterator_id] = timer
+        timer.start()
+    return True
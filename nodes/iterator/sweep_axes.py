@@ -0,0 +1,124 @@
+import re
+import json
+from functools import lru_cache
+
+SWEEP_ORDERS = ["first_axis_slowest", "last_axis_slowest", "serpentine"]
+
+# start..stop[:step] with numeric bounds; anything else containing ".." (a
+# path, "a..b") is a plain value
+_NUMBER = r"\s*[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?\s*"
+_RANGE = re.compile(rf"{_NUMBER}\.\.{_NUMBER}(?::{_NUMBER})?")
+
+
+class RangeAxis:
+    # start..stop[:step], inclusive; values are computed, never stored
+    def __init__(self, start, step, count, is_float):
+        self.start = start
+        self.step = step
+        self.count = count
+        self.is_float = is_float
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        value = self.start + i * self.step
+        return round(value, 10) if self.is_float else value
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _parse_range(spec):
+    bounds, _, step = spec.partition(":")
+    start, _, stop = bounds.partition("..")
+    start, stop = _number(start.strip()), _number(stop.strip())
+    step = _number(step.strip()) if step.strip() else 1
+    if step == 0 or (stop - start) * step < 0:
+        raise ValueError(f"range {spec} never reaches its end")
+    is_float = any(isinstance(v, float) for v in (start, stop, step))
+    # Small epsilon so 0..1:0.1 includes 1.0 despite float rounding
+    count = int((stop - start) / step + (1e-9 if is_float else 0)) + 1
+    return RangeAxis(start, step, count, is_float)
+
+
+def _parse_list(spec):
+    if spec.startswith("["):
+        values = json.loads(spec)
+    else:
+        values = [v.strip() for v in spec.split(",") if v.strip()]
+        try:
+            values = [_number(v) for v in values]
+        except ValueError:
+            pass
+    if not values:
+        raise ValueError("empty value list")
+    return values
+
+
+@lru_cache(maxsize=32)
+def parse_axes(text):
+    # One axis per line, "name: values", where values is a comma list
+    # (numbers or text), a JSON list, or a range start..stop[:step]
+    axes = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, sep, spec = line.partition(":")
+        name, spec = name.strip(), spec.strip()
+        if not sep or not name or not spec:
+            raise ValueError(f"line {line_no}: expected 'name: values'")
+        try:
+            if _RANGE.fullmatch(spec):
+                values = _parse_range(spec)
+            else:
+                values = _parse_list(spec)
+        except ValueError as e:
+            raise ValueError(f"line {line_no} ({name}): {e}")
+        axes.append((name, values))
+    return tuple(axes)
+
+
+def order_axes(axes, order, slow_axes=""):
+    # Axes from slowest to fastest. Listed slow_axes come first (slowest
+    # first), the rest keep their order, which last_axis_slowest reverses.
+    rest = list(axes) if order != "last_axis_slowest" else list(reversed(axes))
+    names = [n.strip() for n in slow_axes.split(",") if n.strip()]
+    slow = []
+    for name in names:
+        match = next((a for a in rest if a[0] == name), None)
+        if match is None:
+            raise ValueError(f"unknown axis '{name}' in slow_axes")
+        rest.remove(match)
+        slow.append(match)
+    return slow + rest
+
+
+def sweep_size(axes):
+    size = 1
+    for _, values in axes:
+        size *= len(values)
+    return size
+
+
+def decode_index(axes, index, serpentine=False):
+    # Mixed-radix digits of index, slowest axis first. In serpentine order
+    # each axis runs backwards whenever the counter of the slower axes is
+    # odd, so consecutive points differ in exactly one axis.
+    params = {}
+    stride = sweep_size(axes)
+    for name, values in axes:
+        radix = len(values)
+        stride //= radix
+        digit = (index // stride) % radix
+        if serpentine and (index // (stride * radix)) % 2:
+            digit = radix - 1 - digit
+        params[name] = values[digit]
+    return params
@@ -0,0 +1,159 @@
+import os
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+import ffmpeg
+from .encoder_profiles import cap_threads
+from .ffmpeg_process import get_output_args, prepare_input_streams, write_concat_list
+from .ffmpeg_runner import run_ffmpeg
+from .normalize import cpu_budget, worker_budget
+from .probe_cache import get_keyframes_many
+
+ENCODE_ENGINES = ["serial", "chunked"]
+
+# Containers whose separately encoded chunks join with the concat demuxer
+_CHUNKED_FORMATS = ("mp4", "mkv", "mov", "webm", "avi")
+
+# Chunk length in seconds; 0 sizes chunks so every worker gets about two
+_CHUNK_SECONDS = float(os.environ.get("COMFY_AUTOMATION_CHUNK_SECONDS", "0"))
+_MIN_CHUNK_SECONDS = 2.0
+
+
+def can_chunk(plan, output_format):
+    # Re-encoded joins without transitions whose clip lengths are all known
+    return (
+        output_format in _CHUNKED_FORMATS
+        and plan["target"] is not None
+        and plan["transition_type"] == "none"
+        and all(plan["durations"])
+    )
+
+
+def plan_chunks(durations, keyframes, chunk_seconds):
+    # (clip index, start, length) pieces of about chunk_seconds. Cuts sit on
+    # source keyframes where known, so no chunk decodes frames it throws
+    # away, and a chunk never spans two clips.
+    chunks = []
+    for i, duration in enumerate(durations):
+        points = keyframes[i] or []
+        cuts = [0.0]
+        target = chunk_seconds
+        while target < duration - chunk_seconds / 2:
+            cut = next((p for p in points if p >= target), None)
+            if cut is None:
+                cut = target if not points else duration
+            if cut >= duration - chunk_seconds / 2:
+                break
+            cuts.append(cut)
+            target = cut + chunk_seconds
+        cuts.append(duration)
+        chunks.extend((i, a, b - a) for a, b in zip(cuts, cuts[1:]))
+    return chunks
+
+
+def chunked_concat(video_paths, output_path, output_format, plan):
+    # Encodes the joined timeline as independent closed-GOP chunks in
+    # parallel ffmpeg processes (audio as one more job) and stream-copies
+    # them together. Returns False when the job is too short to split or a
+    # chunk fails, so the caller can run the serial encode.
+    durations = plan["durations"]
+    total = sum(durations)
+    chunk_seconds = _CHUNK_SECONDS or max(
+        _MIN_CHUNK_SECONDS, total / (2 * cpu_budget())
+    )
+    probed = get_keyframes_many(video_paths)
+    keyframes = [[k[0] for k in p[1]] if p else None for p in probed]
+    chunks = plan_chunks(durations, keyframes, chunk_seconds)
+    if len(chunks) < 2:
+        return False
+
+    # Every chunk starts on a keyframe and references nothing before it.
+    # Scaling, fps and sar are always applied so all chunks share one time
+    # base and one layout, as the serial concat filter would produce.
+    encoder_args = get_output_args(output_format, plan["encoder_profile"])
+    encoder_args.setdefault("pix_fmt", "yuv420p")
+    encoder_args["flags"] = "+cgop"
+    jobs = len(chunks) + (1 if plan["has_audio"] else 0)
+    workers, threads = worker_budget(jobs)
+    threads = cap_threads(encoder_args, threads)["threads"]
+
+    ext = os.path.splitext(output_path)[1]
+    work_dir = os.path.splitext(output_path)[0] + "_chunks"
+    os.makedirs(work_dir, exist_ok=True)
+    chunk_paths = [
+        os.path.join(work_dir, f"chunk_{n:05d}{ext}") for n in range(len(chunks))
+    ]
+    audio_path = os.path.join(work_dir, f"audio{ext}")
+
+    def encode_chunk(n):
+        i, start, length = chunks[n]
+        chunk_plan = dict(plan)
+        chunk_plan["inputs"] = [plan["inputs"][i]]
+        chunk_plan["durations"] = [length]
+        chunk_plan["has_audio"] = False
+        chunk_plan["conform_video"] = True
+        v_streams, _ = prepare_input_streams(
+            [video_paths[i]], chunk_plan, [(start, length)]
+        )
+        started = time.perf_counter()
+        run_ffmpeg(
+            ffmpeg.output(
+                v_streams[0], chunk_paths[n], **encoder_args
+            ).overwrite_output(),
+            chunk_paths[n],
+            length,
+            label="chunk",
+        )
+        return time.perf_counter() - started
+
+    def encode_audio():
+        # Audio is cheap and its frames do not line up with video chunk
+        # cuts, so it is encoded in one piece with the container default
+        _, a_streams = prepare_input_streams(video_paths, plan)
+        started = time.perf_counter()
+        run_ffmpeg(
+            ffmpeg.concat(*a_streams, v=0, a=1).output(audio_path).overwrite_output(),
+            audio_path,
+            total,
+            label="audio",
+        )
+        return time.perf_counter() - started
+
+    print(
+        f"[Video Concatenation] Encoding {len(chunks)} chunks of ~{chunk_seconds:.1f}s with {workers} worker(s) x {threads} thread(s)"
+    )
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(encode_chunk, n) for n in range(len(chunks))]
+            if plan["has_audio"]:
+                futures.append(pool.submit(encode_audio))
+            encode_seconds = sum(f.result() for f in futures)
+
+        list_path = os.path.join(work_dir, "chunks.txt")
+        write_concat_list(chunk_paths, list_path)
+        streams = [ffmpeg.input(list_path, format="concat", safe=0).video]
+        if plan["has_audio"]:
+            streams.append(ffmpeg.input(audio_path).audio)
+        run_ffmpeg(
+            ffmpeg.output(*streams, output_path, c="copy").overwrite_output(),
+            output_path,
+            label="join",
+        )
+    except ffmpeg.Error as e:
+        print(
+            f"[Video Concatenation] Chunked encode failed: {e.stderr.decode() if e.stderr else str(e)}"
+        )
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Summed per-process time over wall time: how many encodes overlapped,
+    # not a speedup, since processes sharing the cores each run slower;
+    # benchmarks/bench_concat.py --engines serial,chunked measures that
+    wall = time.perf_counter() - started
+    plan["reasons"].append(
+        f"chunked encode: {len(chunks)} chunks on {workers} worker(s), {encode_seconds:.1f}s of encoding in {wall:.1f}s (parallelism x{encode_seconds / max(wall, 1e-6):.2f})"
+    )
+    print(f"[Video Concatenation] {plan['reasons'][-1]}")
+    return True
@@ -0,0 +1,162 @@
+import os
+import shutil
+from .chunked_encode import can_chunk, chunked_concat
+from .concat_plan import build_concat_plan, describe_plan
+from .encoder_profiles import DEFAULT_PROFILE
+from .ffmpeg_process import simple_concat, stream_copy_concat, xfade_concat
+from .normalize import normalize_concat
+from .probe_cache import probe_media_many
+from .transition_segments import segmented_xfade_concat
+
+
+def run_plan(
+    video_paths,
+    output_path,
+    output_format,
+    plan,
+    stream_infos,
+    encode_engine="serial",
+):
+    success = False
+    if plan["mode"] == "stream_copy":
+        success = stream_copy_concat(video_paths, output_path)
+    elif plan["mode"] == "segmented_xfade":
+        success = segmented_xfade_concat(
+            video_paths,
+            output_path,
+            output_format,
+            plan["transition_type"],
+            plan["transition_time"],
+            plan["durations"],
+            stream_infos,
+            plan["encoder_profile"],
+        )
+    elif plan["mode"] == "normalize":
+        success = normalize_concat(
+            video_paths, output_path, output_format, plan, stream_infos
+        )
+
+    # The copy paths only remux, so falling back from them still encodes once
+    if not success:
+        if plan["transition_type"] == "none":
+            if encode_engine == "chunked" and can_chunk(plan, output_format):
+                success = chunked_concat(video_paths, output_path, output_format, plan)
+            if not success:
+                success = simple_concat(video_paths, output_path, output_format, plan)
+        else:
+            success = xfade_concat(
+                video_paths,
+                output_path,
+                output_format,
+                plan["transition_type"],
+                plan["transition_time"],
+                plan["durations"],
+                plan,
+            )
+    return success
+
+
+def slice_plan(plan, start, end):
+    # Same target profile for a sub-range of the inputs, so batch results
+    # come out stream compatible with each other
+    sliced = dict(plan)
+    sliced["inputs"] = plan["inputs"][start:end]
+    sliced["durations"] = plan["durations"][start:end]
+    return sliced
+
+
+def concat_videos(
+    video_paths,
+    output_path,
+    output_format,
+    transition_type="none",
+    transition_time=1.0,
+    concat_mode="auto",
+    max_batch_size=32,
+    encode_engine="serial",
+    encoder_profile=DEFAULT_PROFILE,
+):
+    # Returns (success, plan description)
+    max_batch_size = max(2, max_batch_size)
+
+    # Probe every input once, concurrently; results are cached per file
+    stream_infos = probe_media_many(video_paths)
+
+    # Pick the single graph that fits all inputs before encoding anything
+    plan = build_concat_plan(
+        stream_infos,
+        output_format,
+        transition_type,
+        transition_time,
+        concat_mode,
+        encoder_profile,
+    )
+
+    # Copy-based modes have no filter graph to grow, everything else is
+    # merged in batches of bounded size whose results are joined again.
+    # Chunked encodes are batched too: a failed chunk falls back to the
+    # single-graph concat, which has to stay within the bound.
+    if (
+        plan["mode"] in ("stream_copy", "segmented_xfade", "normalize")
+        or len(video_paths) <= max_batch_size
+    ):
+        plan_text = describe_plan(plan)
+        print(
+            f"[Video Concatenation] Merging {len(video_paths)} videos, plan:\n{plan_text}"
+        )
+        success = run_plan(
+            video_paths, output_path, output_format, plan, stream_infos, encode_engine
+        )
+        # Engines add what they measured while running
+        return success, describe_plan(plan)
+
+    batch_count = (len(video_paths) + max_batch_size - 1) // max_batch_size
+    plan["reasons"].append(
+        f"{len(video_paths)} inputs merged in {batch_count} batches of up to {max_batch_size}"
+    )
+    plan_text = describe_plan(plan)
+    print(
+        f"[Video Concatenation] Merging {len(video_paths)} videos, plan:\n{plan_text}"
+    )
+
+    ext = os.path.splitext(output_path)[1]
+    work_dir = os.path.splitext(output_path)[0] + "_batches"
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        batch_paths = []
+        for b, start in enumerate(range(0, len(video_paths), max_batch_size)):
+            end = start + max_batch_size
+            batch_path = os.path.join(work_dir, f"batch_{b:05d}{ext}")
+            batch_plan = slice_plan(plan, start, end)
+            if not run_plan(
+                video_paths[start:end],
+                batch_path,
+                output_format,
+                batch_plan,
+                stream_infos[start:end],
+                encode_engine,
+            ):
+                print(f"[Video Concatenation] Batch {b + 1}/{batch_count} failed")
+                return False, plan_text
+            batch_paths.append(batch_path)
+
+        # Batch results share codec and profile, so this level normally
+        # joins them by stream copy (or re-encodes only the transitions).
+        # They are freshly encoded already, hence always "auto" here.
+        joined_path = os.path.join(work_dir, f"joined{ext}")
+        success, _ = concat_videos(
+            batch_paths,
+            joined_path,
+            output_format,
+            plan["transition_type"],
+            transition_time,
+            "auto",
+            max_batch_size,
+            encode_engine,
+            encoder_profile,
+        )
+        if success:
+            os.replace(joined_path, output_path)
+        return success, plan_text
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,200 @@
+from collections import Counter
+from .encoder_profiles import DEFAULT_PROFILE
+from .ffmpeg_process import (
+    can_stream_copy,
+    get_matching_encoder_args,
+    get_stream_layout,
+)
+
+
+def _majority(values):
+    # Most common value; ties go to the one seen first
+    counts = Counter(values)
+    return max(values, key=lambda v: (counts[v], -values.index(v)))
+
+
+def _channel_layout(channels):
+    return {1: "mono", 2: "stereo"}.get(channels, f"{channels}c")
+
+
+def pick_reference(stream_infos, output_format):
+    # Index of an input with the most common stream layout among those the
+    # container can take as-is and that we can encode to; None if there is
+    # no such input. If any input has audio the reference must have it too,
+    # so silent clips get silence instead of everyone losing their audio.
+    with_audio = any(info and info["has_audio"] for info in stream_infos)
+    candidates = [
+        i
+        for i, info in enumerate(stream_infos)
+        if can_stream_copy([info], output_format)
+        and get_matching_encoder_args(info, output_format) is not None
+        and (info["has_audio"] or not with_audio)
+    ]
+    if not candidates:
+        return None
+    layouts = [get_stream_layout(stream_infos[i]) for i in candidates]
+    return candidates[layouts.index(_majority(layouts))]
+
+
+def build_concat_plan(
+    stream_infos,
+    output_format,
+    transition_type="none",
+    transition_time=1.0,
+    concat_mode="auto",
+    encoder_profile=DEFAULT_PROFILE,
+):
+    # Decide everything up front from the probed streams so the job runs a
+    # single ffmpeg graph that is known to fit all inputs, instead of
+    # encoding, failing and retrying with a different graph.
+    reasons = []
+    if encoder_profile != DEFAULT_PROFILE:
+        reasons.append(f"encoder profile: {encoder_profile}")
+
+    if any(info is None for info in stream_infos):
+        # Unprobeable inputs: nothing is known about their audio or size, so
+        # run the plain video-only graph
+        reasons.append("some inputs could not be probed, concatenating video only")
+        return {
+            "mode": "filter_concat",
+            "reference": None,
+            "encoder_profile": encoder_profile,
+            "reasons": reasons,
+            "has_audio": False,
+            "conform_video": False,
+            "conform_audio": False,
+            "target": None,
+            "inputs": [{"scale": False, "silent": False} for _ in stream_infos],
+            "durations": [None] * len(stream_infos),
+            "transition_type": "none",
+            "transition_time": transition_time,
+        }
+
+    durations = [info["duration"] for info in stream_infos]
+
+    # Target profile: the layout shared by most inputs. yuv420p needs even
+    # dimensions, so odd sizes are rounded down.
+    size = _majority([(info["width"], info["height"]) for info in stream_infos])
+    width, height = size[0] - size[0] % 2, size[1] - size[1] % 2
+    fps = _majority([info["fps"] for info in stream_infos])
+    target = {"width": width, "height": height, "fps": fps}
+
+    inputs = []
+    for info in stream_infos:
+        inputs.append(
+            {
+                "scale": (info["width"], info["height"]) != (width, height),
+                "silent": not info["has_audio"],
+            }
+        )
+
+    scaled = sum(1 for spec in inputs if spec["scale"])
+    if scaled:
+        reasons.append(f"{scaled} input(s) scaled/padded to {width}x{height}")
+    fps_mismatch = any(info["fps"] != fps for info in stream_infos)
+    if fps_mismatch:
+        reasons.append(f"frame rates differ, all inputs resampled to {fps} fps")
+    conform_video = bool(scaled) or fps_mismatch
+
+    # Audio: keep it if any input has it and fill the gaps with silence
+    audio_infos = [info for info in stream_infos if info["has_audio"]]
+    has_audio = bool(audio_infos) and output_format != "gif"
+    conform_audio = False
+    if has_audio:
+        sample_rate = _majority([info["sample_rate"] for info in audio_infos])
+        channels = _majority([info["channels"] for info in audio_infos])
+        target["sample_rate"] = sample_rate
+        target["channel_layout"] = _channel_layout(channels)
+
+        silent = len(stream_infos) - len(audio_infos)
+        if silent:
+            if any(durations[i] is None for i, s in enumerate(inputs) if s["silent"]):
+                reasons.append("silent inputs of unknown length, output is video-only")
+                has_audio = False
+            else:
+                reasons.append(f"silent audio synthesized for {silent} input(s)")
+
+        if has_audio and any(
+            (info["sample_rate"], info["channels"]) != (sample_rate, channels)
+            for info in audio_infos
+        ):
+            conform_audio = True
+            reasons.append(
+                f"audio resampled to {sample_rate} Hz {target['channel_layout']}"
+            )
+    elif audio_infos:
+        reasons.append("gif has no audio track, output is video-only")
+    else:
+        reasons.append("no input has audio, output is video-only")
+
+    # Transitions need a duration for every clip, longer than the fade
+    if transition_type != "none":
+        if any(d is None for d in durations):
+            reasons.append("clip durations unknown, transitions disabled")
+            transition_type = "none"
+        elif any(d <= transition_time for d in durations):
+            reasons.append(
+                f"a clip is shorter than the {transition_time}s transition, transitions disabled"
+            )
+            transition_type = "none"
+
+    stream_compatible = concat_mode == "auto" and can_stream_copy(
+        stream_infos, output_format
+    )
+    if concat_mode != "auto":
+        reasons.append(f"concat_mode is {concat_mode}")
+
+    if transition_type == "none":
+        mode = "stream_copy" if stream_compatible else "filter_concat"
+    else:
+        mode = "segmented_xfade" if stream_compatible else "xfade"
+        # xfade refuses inputs whose time bases differ; the fps filter
+        # gives every clip the same one
+        conform_video = conform_video or mode == "xfade"
+    if stream_compatible:
+        reasons.append("all inputs share codec, resolution, fps and pixel format")
+
+    # Mismatched clips can be conformed one process each, in parallel, to
+    # the majority layout and then joined without another encode. The
+    # single-graph mode above stays the fallback.
+    reference = None
+    if concat_mode == "auto" and not stream_compatible and len(stream_infos) > 1:
+        reference = pick_reference(stream_infos, output_format)
+    if reference is not None:
+        layout = get_stream_layout(stream_infos[reference])
+        conformed = sum(1 for i in stream_infos if get_stream_layout(i) != layout)
+        reasons.append(
+            f"{conformed} input(s) conformed in parallel to the majority stream layout, joined by stream copy"
+        )
+        mode = "normalize"
+
+    return {
+        "mode": mode,
+        "reference": reference,
+        "encoder_profile": encoder_profile,
+        "reasons": reasons,
+        "has_audio": has_audio,
+        "conform_video": conform_video,
+        "conform_audio": conform_audio,
+        "target": target,
+        "inputs": inputs,
+        "durations": durations,
+        "transition_type": transition_type,
+        "transition_time": transition_time,
+    }
+
+
+def describe_plan(plan):
+    lines = [f"mode: {plan['mode']}"]
+    target = plan.get("target")
+    if target:
+        lines.append(
+            f"target: {target['width']}x{target['height']} @ {target['fps']} fps"
+            + (
+                f", audio {target['sample_rate']} Hz {target['channel_layout']}"
+                if plan["has_audio"]
+                else ", no audio"
+            )
+        )
+    lines.extend(f"- {reason}" for reason in plan["reasons"])
+    return "\n".join(lines)
@@ -0,0 +1,161 @@
+import os
+import json
+import threading
+
+# JSON file with user-defined profiles; by default in the ComfyUI user dir
+_PROFILES_PATH = os.environ.get("COMFY_AUTOMATION_ENCODER_PROFILES", "")
+
+DEFAULT_PROFILE = "balanced"
+
+# Encoder options per profile and encoder. "threads" caps the threads of
+# every ffmpeg process (0 = ffmpeg decides); parallel engines never go above
+# their own per-process share. balanced is what every encode used before
+# profiles existed, so it must not change.
+_BUILTIN_PROFILES = {
+    "draft": {
+        "threads": 0,
+        "libx264": {"preset": "veryfast", "crf": "28"},
+        "libx265": {"preset": "veryfast", "crf": "30"},
+        "mpeg4": {"qscale:v": "6"},
+        "libvpx-vp9": {
+            "crf": "36",
+            "b:v": "0",
+            "deadline": "realtime",
+            "cpu-used": "8",
+            "row-mt": "1",
+        },
+    },
+    "balanced": {
+        "threads": 0,
+        "libx264": {"preset": "medium", "crf": "23"},
+        # x265's own defaults, about the quality of x264 crf 23
+        "libx265": {"preset": "medium", "crf": "28"},
+        "mpeg4": {"qscale:v": "3"},
+        "libvpx-vp9": {"crf": "30", "b:v": "0"},
+    },
+    "final": {
+        "threads": 0,
+        "libx264": {"preset": "slow", "crf": "18"},
+        "libx265": {"preset": "slow", "crf": "20"},
+        "mpeg4": {"qscale:v": "2"},
+        "libvpx-vp9": {
+            "crf": "24",
+            "b:v": "0",
+            "deadline": "good",
+            "cpu-used": "1",
+            "row-mt": "1",
+        },
+    },
+}
+
+
+def _default_profiles_path():
+    try:
+        import folder_paths
+
+        base = folder_paths.get_user_directory()
+    except (ImportError, AttributeError):
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, "automation_encoder_profiles.json")
+
+
+class EncoderProfiles:
+    # Built-in tiers plus the user's profile file, re-read whenever its
+    # modification time changes. A user profile names a "base" profile
+    # (default balanced) and overrides single options on top of it:
+    #   {"preview": {"base": "draft", "threads": 2, "libx264": {"crf": "32"}}}
+    # A user profile with a built-in name replaces that tier.
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._profiles = dict(_BUILTIN_PROFILES)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return self._profiles
+        self._mtime = mtime
+
+        profiles = dict(_BUILTIN_PROFILES)
+        if mtime is not None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    user = json.load(f)
+                if not isinstance(user, dict):
+                    raise ValueError("top level must be an object")
+                for name, spec in user.items():
+                    profiles[name] = self._merge(profiles, name, spec)
+            except (OSError, ValueError, TypeError) as e:
+                print(
+                    f"[Video Concatenation] Ignoring encoder profiles in {self.path}: {e}"
+                )
+                profiles = dict(_BUILTIN_PROFILES)
+        self._profiles = profiles
+        return profiles
+
+    @staticmethod
+    def _merge(profiles, name, spec):
+        if not isinstance(spec, dict):
+            raise ValueError(f"profile {name} must be an object")
+        base = profiles.get(spec.get("base", DEFAULT_PROFILE))
+        if base is None:
+            raise ValueError(f"profile {name} has unknown base {spec['base']}")
+        merged = {"threads": int(spec.get("threads", base["threads"]))}
+        for encoder in set(base) | set(spec):
+            if encoder in ("base", "threads"):
+                continue
+            options = dict(base.get(encoder, {}))
+            options.update({k: str(v) for k, v in (spec.get(encoder) or {}).items()})
+            merged[encoder] = options
+        return merged
+
+    def names(self):
+        with self._lock:
+            profiles = self._load()
+        return list(_BUILTIN_PROFILES) + sorted(
+            n for n in profiles if n not in _BUILTIN_PROFILES
+        )
+
+    def get(self, name):
+        # Unknown names (a profile removed from the file) fall back to balanced
+        with self._lock:
+            profiles = self._load()
+        profile = profiles.get(name)
+        if profile is None:
+            print(
+                f"[Video Concatenation] Unknown encoder profile {name}, using {DEFAULT_PROFILE}"
+            )
+            profile = profiles[DEFAULT_PROFILE]
+        return profile
+
+
+_ENCODER_PROFILES = None
+
+
+def get_encoder_profiles():
+    global _ENCODER_PROFILES
+    if _ENCODER_PROFILES is None:
+        _ENCODER_PROFILES = EncoderProfiles(_PROFILES_PATH or _default_profiles_path())
+    return _ENCODER_PROFILES
+
+
+def profile_encoder_args(profile, vcodec):
+    # Options of one profile for one encoder, threads included when capped
+    spec = get_encoder_profiles().get(profile)
+    args = dict(spec.get(vcodec, {}))
+    if spec["threads"]:
+        args["threads"] = spec["threads"]
+    return args
+
+
+def cap_threads(encoder_args, threads):
+    # Per-process thread share of a parallel engine, lowered to the
+    # profile's cap if it sets one
+    cap = encoder_args.get("threads")
+    encoder_args["threads"] = min(threads, int(cap)) if cap else threads
+    return encoder_args
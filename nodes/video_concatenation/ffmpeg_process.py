@@ -1,77 +1,305 @@
+import os
 import ffmpeg
+from .encoder_profiles import DEFAULT_PROFILE, profile_encoder_args
+from .ffmpeg_runner import FFmpegCancelled, run_ffmpeg
 
+# Codecs that can be stream-copied into each container without re-encoding.
+# None means the container accepts anything (Matroska).
+_COPY_VIDEO_CODECS = {
+    "mp4": {"h264", "hevc", "av1", "mpeg4"},
+    "mov": {"h264", "hevc", "mpeg4", "prores", "mjpeg"},
+    "mkv": None,
+    "webm": {"vp8", "vp9", "av1"},
+    "avi": {"mpeg4", "h264", "mjpeg"},
+}
 
-def probe_video(video_path):
+_COPY_AUDIO_CODECS = {
+    "mp4": {"aac", "mp3", "opus", "alac"},
+    "mov": {"aac", "mp3", "alac", "pcm_s16le", "pcm_s24le"},
+    "mkv": None,
+    "webm": {"opus", "vorbis"},
+    "avi": {"mp3", "ac3", "pcm_s16le"},
+}
+
+# The re-encode path forces yuv420p for these containers, so only copy
+# streams that would come out the same way.
+_COPY_REQUIRED_PIX_FMT = {
+    "mp4": "yuv420p",
+    "mov": "yuv420p",
+    "mkv": "yuv420p",
+}
+
+
+# Fields that have to be identical for clips to be joined without re-encoding
+_STREAM_LAYOUT_KEYS = (
+    "video_codec",
+    "profile",
+    "width",
+    "height",
+    "pix_fmt",
+    "fps",
+    "sar",
+    "audio_codec",
+    "sample_rate",
+    "channels",
+)
+
+
+def get_stream_layout(stream_info):
+    return tuple(stream_info[k] for k in _STREAM_LAYOUT_KEYS)
+
+
+def can_stream_copy(stream_infos, output_format):
+    # Every input must have been probed and share the exact same stream layout,
+    # otherwise the concat demuxer would produce a broken file.
+    if not stream_infos or any(info is None for info in stream_infos):
+        return False
+
+    if output_format not in _COPY_VIDEO_CODECS:
+        return False
+    video_codecs = _COPY_VIDEO_CODECS[output_format]
+    audio_codecs = _COPY_AUDIO_CODECS[output_format]
+
+    first = stream_infos[0]
+    layout = get_stream_layout(first)
+    if any(get_stream_layout(info) != layout for info in stream_infos[1:]):
+        return False
+
+    if video_codecs is not None and first["video_codec"] not in video_codecs:
+        return False
+
+    required_pix_fmt = _COPY_REQUIRED_PIX_FMT.get(output_format)
+    if required_pix_fmt and first["pix_fmt"] != required_pix_fmt:
+        return False
+
+    if first["audio_codec"] is not None:
+        if audio_codecs is not None and first["audio_codec"] not in audio_codecs:
+            return False
+
+    return True
+
+
+def write_concat_list(entries, list_path):
+    # ffconcat list for the concat demuxer; single quotes must be escaped.
+    # Entries are plain paths or dicts with "path" and optional
+    # "inpoint"/"outpoint" (in file timestamps, should sit on keyframes) and
+    # "duration" (length the piece occupies on the joined timeline).
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {"path": entry}
+            escaped = os.path.abspath(entry["path"]).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if entry.get("inpoint") is not None:
+                f.write(f"inpoint {entry['inpoint']:.6f}\n")
+            if entry.get("outpoint") is not None:
+                f.write(f"outpoint {entry['outpoint']:.6f}\n")
+            if entry.get("duration") is not None:
+                f.write(f"duration {entry['duration']:.6f}\n")
+
+
+def stream_copy_concat(entries, output_path):
+    list_path = os.path.splitext(output_path)[0] + "_list.txt"
     try:
-        probe = ffmpeg.probe(video_path)
-        return float(probe["format"]["duration"])
+        write_concat_list(entries, list_path)
+        run_ffmpeg(
+            ffmpeg.input(list_path, format="concat", safe=0)
+            .output(output_path, c="copy")
+            .overwrite_output(),
+            output_path,
+            label="stream copy",
+        )
+        return True
+    except ffmpeg.Error as e:
+        print(
+            f"[Video Concatenation] Stream copy concat failed: {e.stderr.decode() if e.stderr else str(e)}"
+        )
+        return False
+    except FFmpegCancelled:
+        raise
     except Exception as e:
-        print(f"[Video Concatenation] Error probing video {video_path}: {e}")
-        return None
+        print(f"[Video Concatenation] Unexpected error in stream copy concat: {e}")
+        return False
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
 
 
-def get_output_args(output_format):
+def get_output_args(output_format, profile=DEFAULT_PROFILE):
+    # Rate control, speed and threads come from the encoder profile
     if output_format in ["mp4", "mkv", "mov"]:
-        return {
+        args = {
             "vcodec": "libx264",
-            "crf": "23",
-            "preset": "medium",
             "pix_fmt": "yuv420p",  # Critical for Windows 11 compatibility
         }
     elif output_format == "avi":
-        return {
-            "vcodec": "mpeg4",
-            "qscale:v": "3",  # High quality variable bitrate
-        }
+        args = {"vcodec": "mpeg4"}
     elif output_format == "webm":
-        return {
-            "vcodec": "libvpx-vp9",
-            "crf": "30",
-            "b:v": "0",
-        }
-    return {}
+        args = {"vcodec": "libvpx-vp9"}
+    else:
+        return {}
+    args.update(profile_encoder_args(profile, args["vcodec"]))
+    return args
 
 
-def simple_concat(video_paths, output_path, output_format):
-    try:
-        streams = []
-        for v in video_paths:
-            input_node = ffmpeg.input(v)
-            streams.append(input_node.video)
-            streams.append(input_node.audio)
+_MATCHING_VIDEO_ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp8": "libvpx",
+    "vp9": "libvpx-vp9",
+    "mpeg4": "mpeg4",
+}
 
-        joined = ffmpeg.concat(*streams, v=1, a=1).node
-        output_args = get_output_args(output_format)
+_MATCHING_AUDIO_ENCODERS = {
+    "aac": "aac",
+    "mp3": "libmp3lame",
+    "opus": "libopus",
+    "vorbis": "libvorbis",
+    "ac3": "ac3",
+    "pcm_s16le": "pcm_s16le",
+}
 
-        out = ffmpeg.output(joined[0], joined[1], output_path, **output_args)
-        out.overwrite_output().run(capture_stdout=True, capture_stderr=True)
-        return True
-    except ffmpeg.Error as e:
-        print(
-            f"[Video Concatenation] Simple concat failed: {e.stderr.decode() if e.stderr else str(e)}"
-        )
-        # Try video only
-        return simple_concat_video_only(video_paths, output_path, output_format)
-    except Exception as e:
-        print(f"[Video Concatenation] Unexpected error in simple concat: {e}")
-        return False
+_H264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+}
+
+
+def get_matching_encoder_args(stream_info, output_format, profile=DEFAULT_PROFILE):
+    # Encoder settings that reproduce the stream layout of an existing clip,
+    # so freshly encoded pieces can be stream-copied next to it.
+    # Returns None when we have no encoder for the source codec.
+    vcodec = _MATCHING_VIDEO_ENCODERS.get(stream_info["video_codec"])
+    if vcodec is None:
+        return None
+
+    args = get_output_args(output_format, profile)
+    if args.get("vcodec") != vcodec:
+        args = {"vcodec": vcodec, **profile_encoder_args(profile, vcodec)}
+    args["pix_fmt"] = stream_info["pix_fmt"]
+
+    if vcodec == "libx264" and stream_info.get("profile") in _H264_PROFILES:
+        args["profile:v"] = _H264_PROFILES[stream_info["profile"]]
+
+    if stream_info["audio_codec"] is not None:
+        acodec = _MATCHING_AUDIO_ENCODERS.get(stream_info["audio_codec"])
+        if acodec is None:
+            return None
+        args["acodec"] = acodec
+        args["ar"] = stream_info["sample_rate"]
+        args["ac"] = stream_info["channels"]
+
+    return args
+
+
+def _total_duration(durations):
+    # Expected output length for progress reporting, None if unknown
+    if not durations or any(d is None for d in durations):
+        return None
+    return sum(durations)
 
 
-def simple_concat_video_only(video_paths, output_path, output_format):
+# Packets buffered per input; also what keeps equal inputs apart, see below
+_THREAD_QUEUE_SIZE = 512
+
+
+def _clip_input(filename, index, **kwargs):
+    # ffmpeg.input() for one clip position. ffmpeg-python merges nodes with
+    # equal arguments, so a repeated path (or two silent clips of the same
+    # length) would share one filter chain, and a filter output can only
+    # feed one consumer. A per-position thread_queue_size (an input buffer
+    # every demuxer accepts) keeps each position its own -i.
+    # (split/asplit is not an option: acrossfade stalls behind asplit.)
+    return ffmpeg.input(
+        filename, thread_queue_size=_THREAD_QUEUE_SIZE + index, **kwargs
+    )
+
+
+def prepare_input_streams(video_paths, plan, trims=None):
+    # Input streams conformed to the plan's target profile, so one concat or
+    # xfade graph accepts every clip. Returns (video_streams, audio_streams);
+    # the audio list is empty for a video-only plan. trims optionally gives a
+    # (start, length) range to read from each clip.
+    target = plan["target"]
+    v_streams = []
+    a_streams = []
+    for i, (v, spec, duration) in enumerate(
+        zip(video_paths, plan["inputs"], plan["durations"])
+    ):
+        if trims is not None:
+            start, duration = trims[i]
+            inp = _clip_input(v, i, ss=start, t=duration)
+        else:
+            inp = _clip_input(v, i)
+
+        video = inp.video
+        if spec["scale"]:
+            video = video.filter(
+                "scale",
+                target["width"],
+                target["height"],
+                force_original_aspect_ratio="decrease",
+            ).filter("pad", target["width"], target["height"], "(ow-iw)/2", "(oh-ih)/2")
+        if plan["conform_video"]:
+            video = video.filter("fps", target["fps"]).filter("setsar", "1")
+        v_streams.append(video)
+
+        if not plan["has_audio"]:
+            continue
+        if spec["silent"]:
+            # Clip without audio: synthesize silence of the same length
+            audio = _clip_input(
+                f"anullsrc=channel_layout={target['channel_layout']}:sample_rate={target['sample_rate']}",
+                i,
+                f="lavfi",
+                t=duration,
+            ).audio
+        else:
+            audio = inp.audio
+        if plan["conform_audio"] or spec["silent"]:
+            audio = audio.filter("aresample", target["sample_rate"]).filter(
+                "aformat", channel_layouts=target["channel_layout"]
+            )
+        a_streams.append(audio)
+
+    return v_streams, a_streams
+
+
+def simple_concat(video_paths, output_path, output_format, plan):
     try:
-        print("[Video Concatenation] Trying video-only simple concat...")
-        streams = [ffmpeg.input(v).video for v in video_paths]
-        output_args = get_output_args(output_format)
+        v_streams, a_streams = prepare_input_streams(video_paths, plan)
+        output_args = get_output_args(output_format, plan["encoder_profile"])
+
+        if a_streams:
+            streams = []
+            for video, audio in zip(v_streams, a_streams):
+                streams.append(video)
+                streams.append(audio)
+            joined = ffmpeg.concat(*streams, v=1, a=1).node
+            out = ffmpeg.output(joined[0], joined[1], output_path, **output_args)
+        else:
+            out = ffmpeg.concat(*v_streams, v=1, a=0).output(output_path, **output_args)
 
-        ffmpeg.concat(*streams, v=1, a=0).output(
-            output_path, **output_args
-        ).overwrite_output().run(capture_stdout=True, capture_stderr=True)
+        run_ffmpeg(
+            out.overwrite_output(),
+            output_path,
+            _total_duration(plan["durations"]),
+            label="concat",
+        )
         return True
     except ffmpeg.Error as e:
         print(
-            f"[Video Concatenation] Video-only simple concat failed: {e.stderr.decode() if e.stderr else str(e)}"
+            f"[Video Concatenation] Simple concat failed: {e.stderr.decode() if e.stderr else str(e)}"
         )
         return False
+    except FFmpegCancelled:
+        raise
+    except Exception as e:
+        print(f"[Video Concatenation] Unexpected error in simple concat: {e}")
+        return False
 
 
 def xfade_concat(
@@ -81,28 +309,21 @@ def xfade_concat(
     transition_type,
     transition_time,
     video_durations,
+    plan,
 ):
     try:
         # 1. Create input streams
-        v_streams = []
-        a_streams = []
-        for v in video_paths:
-            inp = ffmpeg.input(v)
-            v_streams.append(inp.video)
-            a_streams.append(inp.audio)
+        v_streams, a_streams = prepare_input_streams(video_paths, plan)
 
         # 2. Build filter graph
         curr_v = v_streams[0]
-        curr_a = a_streams[0]
+        curr_a = a_streams[0] if a_streams else None
         current_offset = video_durations[0] - transition_time
 
         for i in range(1, len(video_paths)):
-            next_v = v_streams[i]
-            next_a = a_streams[i]
-
             # Apply xfade
             curr_v = ffmpeg.filter(
-                [curr_v, next_v],
+                [curr_v, v_streams[i]],
                 "xfade",
                 transition=transition_type,
                 duration=transition_time,
@@ -110,24 +331,27 @@ def xfade_concat(
             )
 
             # Apply acrossfade for audio
-            curr_a = ffmpeg.filter([curr_a, next_a], "acrossfade", d=transition_time)
+            if curr_a is not None:
+                curr_a = ffmpeg.filter(
+                    [curr_a, a_streams[i]], "acrossfade", d=transition_time
+                )
 
             # Update offset for the next iteration
             if i < len(video_durations) - 1:
                 current_offset += video_durations[i] - transition_time
 
         # 3. Output
-        output_args = get_output_args(output_format)
-        out = ffmpeg.output(curr_v, curr_a, output_path, **output_args)
-        out.overwrite_output().run(capture_stdout=True, capture_stderr=True)
+        output_args = get_output_args(output_format, plan["encoder_profile"])
+        streams = [curr_v] if curr_a is None else [curr_v, curr_a]
+        out = ffmpeg.output(*streams, output_path, **output_args)
+        total = _total_duration(video_durations)
+        if total is not None:
+            total -= transition_time * (len(video_paths) - 1)
+        run_ffmpeg(out.overwrite_output(), output_path, total, label="xfade")
         return True
 
     except ffmpeg.Error as e:
         print(
             f"[Video Concatenation] Xfade concat failed: {e.stderr.decode() if e.stderr else str(e)}"
         )
-        # Fallback to simple concat video only? Or maybe just simple concat total?
-        # Let's fallback to video-only simple concat as a safe net if audio was the issue,
-        # or maybe the user prefers a hard cut over a failed xfade.
-        # For now, let's try video-only xfade if that was the issue, or just return False to let caller handle fallback.
         return False
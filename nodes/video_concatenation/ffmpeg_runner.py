@@ -0,0 +1,168 @@
+import os
+import subprocess
+import threading
+from collections import deque
+import ffmpeg
+
+try:
+    from comfy.model_management import InterruptProcessingException as _Interrupted
+except ImportError:
+    _Interrupted = Exception
+
+
+class FFmpegCancelled(_Interrupted):
+    # Subclasses ComfyUI's interrupt exception when available, so the
+    # executor reports an interrupted prompt rather than a node error
+    pass
+
+
+# Stand-in hooks; None means ComfyUI's own progress bar / interrupt flag.
+# progress_hook(label, done_seconds, total_seconds), interrupt_check() -> bool
+_PROGRESS_HOOK = None
+_INTERRUPT_CHECK = None
+
+
+def set_progress_hook(hook):
+    global _PROGRESS_HOOK
+    _PROGRESS_HOOK = hook
+
+
+def set_interrupt_check(check):
+    global _INTERRUPT_CHECK
+    _INTERRUPT_CHECK = check
+
+
+def _interrupted():
+    if _INTERRUPT_CHECK is not None:
+        return _INTERRUPT_CHECK()
+    try:
+        import comfy.model_management
+
+        return comfy.model_management.processing_interrupted()
+    except ImportError:
+        return False
+
+
+class _ProgressReporter:
+    _STEPS = 1000
+
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.bar = None
+        if _PROGRESS_HOOK is None and total:
+            try:
+                import comfy.utils
+
+                self.bar = comfy.utils.ProgressBar(self._STEPS)
+            except ImportError:
+                pass
+
+    def update(self, done):
+        if not self.total:
+            return
+        done = min(done, self.total)
+        if _PROGRESS_HOOK is not None:
+            _PROGRESS_HOOK(self.label, done, self.total)
+        elif self.bar is not None:
+            self.bar.update_absolute(int(done / self.total * self._STEPS), self._STEPS)
+
+
+class FFmpegJob:
+    # ffmpeg as a managed subprocess: -progress output is parsed on a reader
+    # thread, stderr is kept as a bounded tail, and wait() polls for
+    # ComfyUI's interrupt, killing the process and removing the partial
+    # output when it is set.
+    _POLL_INTERVAL = 0.25
+
+    def __init__(
+        self,
+        stream_spec,
+        output_path=None,
+        duration=None,
+        label="ffmpeg",
+        pipe_stdin=False,
+    ):
+        args = ffmpeg.compile(stream_spec)
+        extra = ["-progress", "pipe:1", "-nostats"]
+        if not pipe_stdin:
+            extra.append("-nostdin")
+        args[1:1] = extra
+
+        self.args = args
+        self.output_path = output_path
+        self.done_seconds = 0.0
+        self.stderr_tail = deque(maxlen=200)
+        self.progress = _ProgressReporter(label, duration)
+        # A save may be a hardlink to an earlier file at this path; unlink it
+        # so ffmpeg writes a new file instead of truncating the shared one
+        if output_path and os.path.isfile(output_path):
+            os.remove(output_path)
+        self.process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE if pipe_stdin else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.stdin = self.process.stdin
+        self._threads = [
+            threading.Thread(target=self._read_progress, daemon=True),
+            threading.Thread(target=self._read_stderr, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _read_progress(self):
+        for raw in iter(self.process.stdout.readline, b""):
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            # out_time_ms is in microseconds as well (historical naming)
+            if key in ("out_time_us", "out_time_ms") and value.isdigit():
+                self.done_seconds = int(value) / 1_000_000
+        self.process.stdout.close()
+
+    def _read_stderr(self):
+        for line in iter(self.process.stderr.readline, b""):
+            self.stderr_tail.append(line)
+        self.process.stderr.close()
+
+    def check_interrupt(self):
+        if _interrupted():
+            self.cancel()
+            raise FFmpegCancelled("ffmpeg job interrupted")
+
+    def cancel(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for t in self._threads:
+            t.join()
+        self._remove_partial_output()
+
+    def _remove_partial_output(self):
+        if self.output_path and os.path.exists(self.output_path):
+            try:
+                os.remove(self.output_path)
+            except OSError:
+                pass
+
+    def wait(self):
+        while True:
+            try:
+                self.process.wait(timeout=self._POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                self.check_interrupt()
+                self.progress.update(self.done_seconds)
+
+        for t in self._threads:
+            t.join()
+        if self.process.returncode != 0:
+            self._remove_partial_output()
+            raise ffmpeg.Error("ffmpeg", b"", b"".join(self.stderr_tail))
+        self.progress.update(self.progress.total or 0)
+
+
+def run_ffmpeg(stream_spec, output_path=None, duration=None, label="ffmpeg"):
+    # Drop-in for stream_spec.run(capture_stdout=True, capture_stderr=True):
+    # raises ffmpeg.Error on failure and FFmpegCancelled on interrupt
+    FFmpegJob(stream_spec, output_path, duration, label).wait()
@@ -0,0 +1,87 @@
+import ffmpeg
+from .encoder_profiles import DEFAULT_PROFILE
+from .ffmpeg_process import get_matching_encoder_args, get_output_args
+from .ffmpeg_runner import FFmpegJob
+
+
+def encode_image_batch(
+    images,
+    output_path,
+    output_format,
+    frame_rate,
+    chunk_size=16,
+    profile=DEFAULT_PROFILE,
+    reference=None,
+):
+    # ComfyUI IMAGE batch ([frames, height, width, channels], float 0..1)
+    # piped as rawvideo into ffmpeg's stdin. Frames are converted to uint8
+    # chunk by chunk (on the tensor's device), so at most chunk_size frames
+    # exist in a second representation at any time. With a reference (a
+    # probed clip) the frames are encoded to its exact stream layout, silent
+    # audio included, so they can be stream-copied next to it.
+    if images is None or len(images.shape) != 4 or images.shape[0] == 0:
+        return False
+
+    frame_count, height, width, channels = images.shape
+    pix_fmt = {3: "rgb24", 4: "rgba"}.get(channels)
+    if pix_fmt is None:
+        print(f"[Video Concatenation] Unsupported IMAGE channel count: {channels}")
+        return False
+
+    stream = ffmpeg.input(
+        "pipe:",
+        format="rawvideo",
+        pix_fmt=pix_fmt,
+        s=f"{width}x{height}",
+        framerate=frame_rate,
+    ).video
+    duration = frame_count / frame_rate
+    streams = [stream]
+    encoder_args = None
+    if reference is not None:
+        encoder_args = get_matching_encoder_args(reference, output_format, profile)
+    if encoder_args is None:
+        encoder_args = get_output_args(output_format, profile)
+        if width % 2 or height % 2:
+            # yuv420p needs even dimensions
+            streams[0] = stream.filter("pad", "ceil(iw/2)*2", "ceil(ih/2)*2")
+    else:
+        w, h = reference["width"], reference["height"]
+        sar = reference["sar"] if reference["sar"] not in ("0:1", "N/A") else "1:1"
+        streams[0] = (
+            stream.filter("scale", w, h, force_original_aspect_ratio="decrease")
+            .filter("pad", w, h, "(ow-iw)/2", "(oh-ih)/2")
+            .filter("fps", reference["fps"])
+            .filter("setsar", sar.replace(":", "/"))
+        )
+        if reference["has_audio"]:
+            # Sample rate and channels come from the encoder args
+            streams.append(ffmpeg.input("anullsrc", f="lavfi", t=duration).audio)
+
+    job = FFmpegJob(
+        ffmpeg.output(*streams, output_path, **encoder_args).overwrite_output(),
+        output_path,
+        duration,
+        label="encode frames",
+        pipe_stdin=True,
+    )
+
+    try:
+        for start in range(0, frame_count, chunk_size):
+            job.check_interrupt()
+            chunk = images[start : start + chunk_size]
+            frames = chunk.mul(255.0).clamp_(0, 255).round_().byte().cpu()
+            job.stdin.write(frames.contiguous().numpy().tobytes())
+        job.stdin.close()
+    except (BrokenPipeError, OSError) as e:
+        # ffmpeg exited early; wait() reports its error output
+        print(f"[Video Concatenation] ffmpeg stopped reading frames: {e}")
+
+    try:
+        job.wait()
+    except ffmpeg.Error as e:
+        print(
+            f"[Video Concatenation] Encoding IMAGE frames failed: {e.stderr.decode(errors='replace')}"
+        )
+        return False
+    return True
@@ -0,0 +1,273 @@
+import os
+import ffmpeg
+from .concat_engine import slice_plan
+from .concat_plan import build_concat_plan
+from .ffmpeg_process import (
+    can_stream_copy,
+    get_matching_encoder_args,
+    get_output_args,
+    prepare_input_streams,
+    stream_copy_concat,
+)
+from .ffmpeg_runner import run_ffmpeg
+from .probe_cache import get_keyframes, probe_media
+from .transition_segments import _OUTPOINT_MARGIN, encode_transition_window
+
+# Containers the timeline can be joined in by stream copy; other formats
+# (gif) keep an mp4 timeline that is rendered into the output at the end
+_COPY_FORMATS = ("mp4", "mkv", "mov", "webm", "avi")
+_TIMELINE_FORMAT = "mp4"
+
+
+def new_append_state(output_path, output_format):
+    # output_path should be unique per run (TempArtifacts.allocate), the
+    # pieces go to a work dir named after it
+    work_dir = os.path.splitext(output_path)[0] + "_parts"
+    os.makedirs(work_dir, exist_ok=True)
+    return {
+        "output_path": output_path,
+        "output_format": output_format,
+        # Format of the pieces and of the stream-copied running timeline
+        "copy_format": (
+            output_format if output_format in _COPY_FORMATS else _TIMELINE_FORMAT
+        ),
+        "work_dir": work_dir,
+        # Concat demuxer entries making up the running output
+        "entries": [],
+        # Stream layout every piece has to share (first clip's)
+        "profile": None,
+        # Last piece on the timeline: file, where its copied part starts and
+        # its full length, so the next transition can cut into it
+        "last": None,
+        "clips": [],
+        "finished": False,
+        "part_count": 0,
+    }
+
+
+def _clip_identity(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _part_path(state):
+    ext = state["copy_format"]
+    path = os.path.join(state["work_dir"], f"part_{state['part_count']:05d}.{ext}")
+    state["part_count"] += 1
+    return path
+
+
+def _conform_clip(state, clip_path, info):
+    # Re-encode a clip that doesn't match the running stream layout (or, for
+    # the first clip, doesn't fit the container) so it can be copied in
+    output_format = state["copy_format"]
+    profile = state["profile"]
+
+    if profile is None:
+        plan = build_concat_plan([info], output_format)
+        encoder_args = get_output_args(output_format)
+    else:
+        # With the profile first, every majority tie resolves to its layout
+        plan = slice_plan(build_concat_plan([profile, info], output_format), 1, 2)
+        plan["has_audio"] = profile["has_audio"]
+        encoder_args = get_matching_encoder_args(profile, output_format)
+        if encoder_args is None:
+            return None
+
+    part_path = _part_path(state)
+    v_streams, a_streams = prepare_input_streams([clip_path], plan)
+    run_ffmpeg(
+        ffmpeg.output(
+            *v_streams, *a_streams, part_path, **encoder_args
+        ).overwrite_output(),
+        part_path,
+        info["duration"],
+        label="conform",
+    )
+    return part_path
+
+
+def _append_with_transition(state, clip_path, info, transition_type, transition_time):
+    last = state["last"]
+    last_probed = get_keyframes(last["path"])
+    new_probed = get_keyframes(clip_path)
+    if last_probed is None or new_probed is None:
+        return False
+    last_start, last_keyframes = last_probed
+    new_start, new_keyframes = new_probed
+    if last_start is None or new_start is None:
+        return False
+
+    # Last keyframe of the previous piece that leaves room for the fade, and
+    # first keyframe of the new clip after it. Without one the whole piece
+    # goes into the re-encoded window.
+    tail = next(
+        (
+            k
+            for k in reversed(last_keyframes)
+            if last["head"] < k[0] <= last["duration"] - transition_time
+        ),
+        None,
+    )
+    head = next((k for k in new_keyframes if k[0] >= transition_time), None)
+    tail_pts = tail[0] if tail else last["head"]
+    head_pts = head[0] if head else info["duration"]
+
+    encoder_args = get_matching_encoder_args(state["profile"], state["copy_format"])
+    if encoder_args is None:
+        return False
+
+    window_path = _part_path(state)
+    encode_transition_window(
+        last["path"],
+        last["duration"],
+        tail_pts,
+        clip_path,
+        head_pts,
+        window_path,
+        transition_type,
+        transition_time,
+        encoder_args,
+        state["profile"]["has_audio"],
+    )
+
+    if tail:
+        entry = state["entries"][-1]
+        entry["outpoint"] = last_start + tail[1] - _OUTPOINT_MARGIN
+        entry["duration"] = tail[0] - last["head"]
+    else:
+        state["entries"].pop()
+    state["entries"].append({"path": window_path})
+
+    if head:
+        state["entries"].append(
+            {
+                "path": clip_path,
+                "inpoint": new_start + head[0],
+                "duration": info["duration"] - head[0],
+            }
+        )
+        state["last"] = {
+            "path": clip_path,
+            "head": head[0],
+            "duration": info["duration"],
+        }
+    else:
+        # The whole clip ended up in the window, which becomes the last piece
+        window_info = probe_media(window_path)
+        if window_info is None:
+            return False
+        state["last"] = {
+            "path": window_path,
+            "head": 0.0,
+            "duration": window_info["duration"],
+        }
+    return True
+
+
+def append_clip(state, clip_path, transition_type="none", transition_time=1.0):
+    # Adds one clip to the timeline of the running output. Only new material
+    # (and transition windows) is encoded, and nothing else is rewritten, so
+    # each append costs the same however long the video has grown;
+    # finish_append() joins the timeline once the loop is done.
+    identity = _clip_identity(clip_path)
+    if identity in state["clips"]:
+        print(f"[Video Concatenation] {clip_path} already appended, skipping")
+        return True
+
+    # The state is only changed once the clip made it in
+    saved = {
+        "entries": [dict(e) for e in state["entries"]],
+        "profile": state["profile"],
+        "last": state["last"],
+    }
+    if not _append_to_timeline(state, clip_path, transition_type, transition_time):
+        state.update(saved)
+        return False
+    state["clips"].append(identity)
+    return True
+
+
+def _append_to_timeline(state, clip_path, transition_type, transition_time):
+    output_format = state["copy_format"]
+    info = probe_media(clip_path)
+    if info is None or info["duration"] is None:
+        return False
+
+    try:
+        reference = state["profile"]
+        if not can_stream_copy(
+            [info] if reference is None else [reference, info], output_format
+        ):
+            print(f"[Video Concatenation] Conforming {clip_path} to the running output")
+            clip_path = _conform_clip(state, clip_path, info)
+            if clip_path is None:
+                return False
+            info = probe_media(clip_path)
+            if info is None:
+                return False
+        if state["profile"] is None:
+            state["profile"] = info
+
+        if state["last"] is None or transition_type == "none":
+            state["entries"].append({"path": clip_path})
+            state["last"] = {
+                "path": clip_path,
+                "head": 0.0,
+                "duration": info["duration"],
+            }
+        elif (
+            info["duration"] <= transition_time
+            or state["last"]["duration"] - state["last"]["head"] < transition_time
+        ):
+            print(
+                "[Video Concatenation] Clip shorter than the transition, appending with a hard cut"
+            )
+            state["entries"].append({"path": clip_path})
+            state["last"] = {
+                "path": clip_path,
+                "head": 0.0,
+                "duration": info["duration"],
+            }
+        elif not _append_with_transition(
+            state, clip_path, info, transition_type, transition_time
+        ):
+            return False
+    except ffmpeg.Error as e:
+        print(
+            f"[Video Concatenation] Appending {clip_path} failed: {e.stderr.decode() if e.stderr else str(e)}"
+        )
+        return False
+    return True
+
+
+def finish_append(state):
+    # Joins the timeline into the output: one stream copy, plus for formats
+    # without stream copy (gif) one encode of the whole video. Everything is
+    # written in the work dir and swapped in, so a save hardlinked to an
+    # earlier output is never rewritten.
+    if not state["entries"]:
+        return False
+    partial_path = os.path.join(state["work_dir"], f"running.{state['copy_format']}")
+    if not stream_copy_concat(state["entries"], partial_path):
+        return False
+    if state["copy_format"] != state["output_format"]:
+        timeline_path = partial_path
+        partial_path = os.path.join(
+            state["work_dir"], f"render.{state['output_format']}"
+        )
+        try:
+            run_ffmpeg(
+                ffmpeg.input(timeline_path)
+                .video.output(partial_path, **get_output_args(state["output_format"]))
+                .overwrite_output(),
+                partial_path,
+                label="render",
+            )
+        except ffmpeg.Error as e:
+            print(
+                f"[Video Concatenation] Rendering {state['output_format']} failed: {e.stderr.decode() if e.stderr else str(e)}"
+            )
+            return False
+    os.replace(partial_path, state["output_path"])
+    return True
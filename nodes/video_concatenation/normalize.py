@@ -0,0 +1,185 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+import ffmpeg
+from .concat_plan import build_concat_plan
+from .encoder_profiles import DEFAULT_PROFILE, cap_threads
+from .ffmpeg_process import (
+    can_stream_copy,
+    get_matching_encoder_args,
+    get_stream_layout,
+    prepare_input_streams,
+    stream_copy_concat,
+)
+from .ffmpeg_runner import run_ffmpeg
+from .probe_cache import get_keyframes_many, probe_media_many
+from .transition_segments import plan_transition_cuts, segmented_xfade_concat
+
+# CPU threads parallel encodes may use together (0 = every core)
+_CPU_BUDGET = int(os.environ.get("COMFY_AUTOMATION_CONCAT_CPU_BUDGET", "0"))
+
+# Keeps the forced tail keyframe clear of frame rounding at the cut
+_KEYFRAME_MARGIN = 0.1
+
+
+def cpu_budget():
+    return _CPU_BUDGET or os.cpu_count() or 1
+
+
+def worker_budget(jobs):
+    # (workers, threads per ffmpeg process). One single-threaded encoder per
+    # core scales better than a few wide ones, so workers come first.
+    budget = cpu_budget()
+    workers = max(1, min(jobs, budget))
+    return workers, max(1, budget // workers)
+
+
+def transition_keyframes(duration, transition_time):
+    # Where a conformed clip gets forced keyframes so segmented transitions
+    # can cut it: right after the incoming fade, right before the outgoing one
+    tail = duration - transition_time - _KEYFRAME_MARGIN
+    if tail <= transition_time:
+        return None
+    return [transition_time, tail]
+
+
+def conform_clip(
+    clip_path,
+    info,
+    reference,
+    output_format,
+    output_path,
+    threads=0,
+    keyframes=None,
+    profile=DEFAULT_PROFILE,
+):
+    # Re-encodes one clip to the stream layout of reference so the two can
+    # be joined by stream copy. Returns False without a matching encoder.
+    encoder_args = get_matching_encoder_args(reference, output_format, profile)
+    if encoder_args is None:
+        return False
+
+    # With the reference first, every majority tie resolves to its layout
+    plan = build_concat_plan([reference, info], output_format)
+    plan["inputs"] = plan["inputs"][1:]
+    plan["durations"] = plan["durations"][1:]
+    if reference["has_audio"] and not plan["has_audio"]:
+        # Silence of unknown length cannot be synthesized
+        return False
+    plan["has_audio"] = reference["has_audio"]
+    if threads:
+        cap_threads(encoder_args, threads)
+    if keyframes:
+        encoder_args["force_key_frames"] = ",".join(f"{t:.3f}" for t in keyframes)
+
+    v_streams, a_streams = prepare_input_streams([clip_path], plan)
+    run_ffmpeg(
+        ffmpeg.output(
+            *v_streams, *a_streams, output_path, **encoder_args
+        ).overwrite_output(),
+        output_path,
+        info["duration"],
+        label="normalize",
+    )
+    return True
+
+
+def normalize_concat(video_paths, output_path, output_format, plan, stream_infos):
+    # Clips that differ from the reference layout (plan["reference"]) are
+    # conformed concurrently, one ffmpeg process per clip, then everything
+    # is joined by stream copy (or segmented transitions). Returns False so
+    # the caller can fall back to the single-graph path.
+    reference = stream_infos[plan["reference"]]
+    layout = get_stream_layout(reference)
+    jobs = [
+        (i, path, info)
+        for i, (path, info) in enumerate(zip(video_paths, stream_infos))
+        if get_stream_layout(info) != layout
+    ]
+
+    # Transitions are only cut into copied clips if every clip has keyframes
+    # in the right places; check before encoding anything, since the
+    # fallback re-encodes all clips anyway
+    keyframes = {}
+    if plan["transition_type"] != "none":
+        transition_time = plan["transition_time"]
+        for i, _, info in jobs:
+            keyframes[i] = transition_keyframes(info["duration"], transition_time)
+            if keyframes[i] is None:
+                return False
+        kept = [i for i in range(len(video_paths)) if i not in keyframes]
+        probed = dict(zip(kept, get_keyframes_many([video_paths[i] for i in kept])))
+        expected = [
+            [(t, t) for t in keyframes[i]] if i in keyframes else probed[i][1]
+            for i in range(len(video_paths))
+            if i in keyframes or probed[i] is not None
+        ]
+        if len(expected) != len(video_paths) or (
+            plan_transition_cuts(plan["durations"], expected, transition_time) is None
+        ):
+            print(
+                "[Video Concatenation] Keyframes too sparse for segmented transitions, skipping normalization"
+            )
+            return False
+
+    ext = os.path.splitext(output_path)[1]
+    work_dir = os.path.splitext(output_path)[0] + "_normalized"
+    os.makedirs(work_dir, exist_ok=True)
+    workers, threads = worker_budget(len(jobs))
+    print(
+        f"[Video Concatenation] Normalizing {len(jobs)} clip(s) with {workers} worker(s) x {threads} thread(s)"
+    )
+
+    def conform(job):
+        i, path, info = job
+        part_path = os.path.join(work_dir, f"clip_{i:05d}{ext}")
+        try:
+            if conform_clip(
+                path,
+                info,
+                reference,
+                output_format,
+                part_path,
+                threads,
+                keyframes.get(i),
+                plan["encoder_profile"],
+            ):
+                return i, part_path
+        except ffmpeg.Error as e:
+            print(
+                f"[Video Concatenation] Normalizing {path} failed: {e.stderr.decode() if e.stderr else str(e)}"
+            )
+        return i, None
+
+    try:
+        # Each job is its own ffmpeg process, so threads only wait on them
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            conformed = list(pool.map(conform, jobs))
+
+        paths = list(video_paths)
+        for i, part_path in conformed:
+            if part_path is None:
+                return False
+            paths[i] = part_path
+
+        infos = probe_media_many(paths)
+        if not can_stream_copy(infos, output_format):
+            print(
+                "[Video Concatenation] Normalized clips still differ, falling back to a single graph"
+            )
+            return False
+
+        if plan["transition_type"] == "none":
+            return stream_copy_concat(paths, output_path)
+        return segmented_xfade_concat(
+            paths,
+            output_path,
+            output_format,
+            plan["transition_type"],
+            plan["transition_time"],
+            [info["duration"] for info in infos],
+            infos,
+            plan["encoder_profile"],
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
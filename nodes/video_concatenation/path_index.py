@@ -0,0 +1,103 @@
+import os
+import time
+import threading
+
+# A refresh stats every indexed directory, so callers in per-iteration paths
+# reuse an index younger than this many seconds
+_MAX_AGE_SECONDS = float(os.environ.get("COMFY_AUTOMATION_PATH_INDEX_MAX_AGE", "10"))
+
+
+def _key(rel_path):
+    return os.path.normcase(os.path.normpath(rel_path))
+
+
+class PathIndex:
+    # Every file under root, keyed by its normalised relative path. Each
+    # directory's listing is kept with its mtime; a refresh stats the known
+    # directories and only re-lists the ones whose mtime changed (a file
+    # added, removed or renamed in them).
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._dirs = {}  # rel dir -> (mtime_ns, file names, subdir names)
+        self._files = {}  # key -> absolute path
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+
+    def _scan(self, rel_dir, visited, parents):
+        abs_dir = os.path.join(self.root, rel_dir)
+        try:
+            st = os.stat(abs_dir)
+        except OSError:
+            return
+        # Symlinked directories are followed, except a link back to one of
+        # the directories above it, which would recurse forever
+        identity = (st.st_dev, st.st_ino)
+        if identity in parents:
+            return
+        mtime = st.st_mtime_ns
+        visited.add(rel_dir)
+
+        cached = self._dirs.get(rel_dir)
+        if cached is not None and cached[0] == mtime:
+            files, subdirs = cached[1], cached[2]
+        else:
+            files, subdirs = [], []
+            try:
+                with os.scandir(abs_dir) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            continue
+                        (subdirs if is_dir else files).append(entry.name)
+            except OSError:
+                return
+            if cached is not None:
+                for name in cached[1]:
+                    self._files.pop(_key(os.path.join(rel_dir, name)), None)
+            for name in files:
+                rel = os.path.join(rel_dir, name)
+                self._files[_key(rel)] = os.path.join(self.root, rel)
+            self._dirs[rel_dir] = (mtime, files, subdirs)
+
+        for name in subdirs:
+            self._scan(os.path.join(rel_dir, name), visited, parents | {identity})
+
+    def refresh(self, max_age=_MAX_AGE_SECONDS):
+        # Skipped when the last refresh is younger than max_age seconds
+        with self._lock:
+            if time.time() - self._refreshed_at < max_age:
+                return
+            visited = set()
+            self._scan("", visited, frozenset())
+            for rel_dir in set(self._dirs) - visited:
+                for name in self._dirs.pop(rel_dir)[1]:
+                    self._files.pop(_key(os.path.join(rel_dir, name)), None)
+            self._refreshed_at = time.time()
+
+    def contains(self, path):
+        return os.path.abspath(path).startswith(self.root + os.sep)
+
+    def lookup(self, path):
+        # Absolute path of a file under root given its relative (or
+        # absolute) path, None if it is absent as of the last refresh()
+        rel = os.path.relpath(path, self.root) if os.path.isabs(path) else path
+        return self._files.get(_key(rel))
+
+    def file_names(self):
+        with self._lock:
+            return [os.path.basename(p) for p in self._files.values()]
+
+
+_PATH_INDEXES = {}
+_PATH_INDEXES_LOCK = threading.Lock()
+
+
+def get_path_index(root):
+    root = os.path.abspath(root)
+    with _PATH_INDEXES_LOCK:
+        index = _PATH_INDEXES.get(root)
+        if index is None:
+            index = _PATH_INDEXES[root] = PathIndex(root)
+    return index
@@ -1,21 +1,89 @@
 import os
+import re
+import glob
 import folder_paths
+from .path_index import get_path_index
 
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".mov", ".webm", ".avi", ".gif", ".m4v"}
 
-def extract_paths(obj):
+
+def natural_sort_key(path):
+    # clip_2 before clip_10
+    return [
+        int(part) if part.isdigit() else part.lower()
+        for part in re.split(r"(\d+)", path)
+    ]
+
+
+def expand_video_source(source, report=True):
+    # A directory (all video files in it) or a glob pattern. Relative sources
+    # are looked up in the ComfyUI output directory first. report=False
+    # leaves an empty result to the caller's diagnostics.
+    source = source.strip() if isinstance(source, str) else ""
+    if not source:
+        return []
+
+    if not os.path.isabs(source):
+        out_source = os.path.join(folder_paths.get_output_directory(), source)
+        if os.path.exists(out_source) or glob.has_magic(source):
+            source = out_source
+
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+        ]
+    else:
+        paths = glob.glob(source, recursive=True)
+
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths and report:
+        print(f"[Video Concatenation] No video files found for source: {source}")
+    return sorted(paths, key=natural_sort_key)
+
+
+def new_diagnostics():
+    # Filled by extract_paths / resolve_video_paths instead of printing per
+    # path; describe_diagnostics() turns it into one log line
+    return {
+        "resolved": {"absolute": 0, "output": 0, "input": 0, "cwd": 0, "annotated": 0},
+        "expanded": 0,
+        "missing": [],
+        "unparsed": [],
+    }
+
+
+def describe_diagnostics(diagnostics):
+    resolved = diagnostics["resolved"]
+    parts = [f"{count} from {where}" for where, count in resolved.items() if count]
+    if diagnostics["expanded"]:
+        parts.append(f"{diagnostics['expanded']} from directory/glob sources")
+    if diagnostics["missing"]:
+        shown = ", ".join(diagnostics["missing"][:5])
+        more = len(diagnostics["missing"]) - 5
+        parts.append(
+            f"{len(diagnostics['missing'])} missing ({shown}{f', +{more} more' if more > 0 else ''})"
+        )
+    if diagnostics["unparsed"]:
+        parts.append(f"unparsed inputs: {', '.join(diagnostics['unparsed'])}")
+    return "; ".join(parts) if parts else "no paths"
+
+
+def extract_paths(obj, diagnostics=None):
     paths = []
     if isinstance(obj, str):
         paths.append(obj)
     elif isinstance(obj, list):
         for item in obj:
-            paths.extend(extract_paths(item))
+            paths.extend(extract_paths(item, diagnostics))
     elif isinstance(obj, dict):
         # Local VHS support
         if "filenames" in obj:
-            paths.extend(extract_paths(obj["filenames"]))
+            paths.extend(extract_paths(obj["filenames"], diagnostics))
         # Some nodes return {'video': 'path'}
         elif "video" in obj:
-            paths.extend(extract_paths(obj["video"]))
+            paths.extend(extract_paths(obj["video"], diagnostics))
     else:
         # Handle new ComfyUI API objects (like VideoFromFile/VideoInput)
         if hasattr(obj, "get_stream_source"):
@@ -23,14 +91,8 @@ def extract_paths(obj):
                 source = obj.get_stream_source()
                 if isinstance(source, str):
                     paths.append(source)
-                else:
-                    print(
-                        f"[Video Concatenation] Concatenation: get_stream_source returned non-string: {type(source)}"
-                    )
-            except Exception as e:
-                print(
-                    f"[Video Concatenation] Concatenation error calling get_stream_source: {e}"
-                )
+            except Exception:
+                pass
         # Handle our own VideoOutput class (recursive concatenation)
         elif hasattr(obj, "video_path"):
             paths.append(obj.video_path)
@@ -38,55 +100,91 @@ def extract_paths(obj):
         if not paths:
             # Fallback: check common attributes
             for attr in ["video", "filename", "path", "full_path"]:
-                if hasattr(obj, attr):
-                    val = getattr(obj, attr)
-                    if isinstance(val, (str, list, dict)):
-                        paths.extend(extract_paths(val))
-                        break
+                val = getattr(obj, attr, None)
+                if isinstance(val, (str, list, dict)):
+                    paths.extend(extract_paths(val, diagnostics))
+                    break
 
-        if not paths:
-            # Final debug: list public attributes
-            attrs = [a for a in dir(obj) if not a.startswith("_")]
-            print(
-                f"[Video Concatenation] Concatenation could not parse {type(obj).__name__}. Attributes: {attrs}"
-            )
+        if not paths and diagnostics is not None:
+            diagnostics["unparsed"].append(type(obj).__name__)
 
     return paths
 
 
-def resolve_video_paths(video_list):
+def resolve_video_paths(video_list, diagnostics=None):
+    # Absolute paths, or names relative to the ComfyUI output / input
+    # directories. Explicit paths are checked with a direct stat, one per
+    # root at most; only names that don't stat fall back to a PathIndex
+    # lookup, refreshed at most every few seconds. Directory and glob
+    # entries are expanded.
+    if diagnostics is None:
+        diagnostics = new_diagnostics()
+    roots = [
+        ("output", folder_paths.get_output_directory()),
+        ("input", folder_paths.get_input_directory()),
+    ]
+
+    def index_lookup(root, path):
+        index = get_path_index(root)
+        index.refresh()
+        return index.lookup(path)
+
     valid_videos = []
     for v in video_list:
         if not v or not isinstance(v, str):
             continue
 
-        # 1. Try absolute path
-        if os.path.isabs(v) and os.path.exists(v):
-            valid_videos.append(v)
-            continue
-
-        # 2. Try ComfyUI output directory
-        out_path = os.path.join(folder_paths.get_output_directory(), v)
-        if os.path.exists(out_path):
-            valid_videos.append(out_path)
-            continue
+        # Directory or glob entries (anything without a video extension is
+        # tried as one, so plain clip names cost no extra stat)
+        if glob.has_magic(v) or os.path.splitext(v)[1].lower() not in VIDEO_EXTENSIONS:
+            expanded = expand_video_source(v, report=False)
+            if expanded:
+                diagnostics["expanded"] += len(expanded)
+                valid_videos.extend(expanded)
+                continue
 
-        # 3. Try ComfyUI input directory
-        in_path = os.path.join(folder_paths.get_input_directory(), v)
-        if os.path.exists(in_path):
-            valid_videos.append(in_path)
-            continue
+        found = None
+        if os.path.isabs(v):
+            if os.path.isfile(v):
+                found = v
+            else:
+                root = next(
+                    (r for _, r in roots if get_path_index(r).contains(v)), None
+                )
+                if root is not None:
+                    found = index_lookup(root, v)
+            if found:
+                diagnostics["resolved"]["absolute"] += 1
+        else:
+            for where, root in roots:
+                candidate = os.path.join(root, v)
+                found = candidate if os.path.isfile(candidate) else None
+                if found:
+                    diagnostics["resolved"][where] += 1
+                    break
+            # Relative to the working directory, as a plain open() would
+            if not found and os.path.isfile(v):
+                found = os.path.abspath(v)
+                diagnostics["resolved"]["cwd"] += 1
+            if not found:
+                for where, root in roots:
+                    found = index_lookup(root, v)
+                    if found:
+                        diagnostics["resolved"][where] += 1
+                        break
 
-        # 4. Use folder_paths helper if available
-        try:
-            resolved = folder_paths.get_annotated_filepath(v)
-            if resolved and os.path.exists(resolved):
-                valid_videos.append(resolved)
-                continue
-        except Exception:
-            pass
+        # Annotated names such as "clip.mp4 [output]"
+        if not found and v.endswith("]"):
+            try:
+                resolved = folder_paths.get_annotated_filepath(v)
+                if resolved and os.path.exists(resolved):
+                    found = resolved
+                    diagnostics["resolved"]["annotated"] += 1
+            except Exception:
+                pass
 
-        print(
-            f"[Video Concatenation] VideoConcatenation: Skipping invalid or missing path: {v}"
-        )
+        if found:
+            valid_videos.append(found)
+        else:
+            diagnostics["missing"].append(v)
     return valid_videos
@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import ffmpeg
+
+
+def _parse_fraction(value):
+    try:
+        num, _, den = str(value).partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _read_media_info(path):
+    probe = ffmpeg.probe(path)
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None:
+        return None
+
+    duration = probe.get("format", {}).get("duration") or video.get("duration")
+    fps = video.get("avg_frame_rate")
+    if not _parse_fraction(fps):
+        fps = video.get("r_frame_rate")
+
+    return {
+        "duration": float(duration) if duration else None,
+        "video_codec": video.get("codec_name"),
+        "profile": video.get("profile"),
+        "width": int(video.get("width", 0)),
+        "height": int(video.get("height", 0)),
+        "pix_fmt": video.get("pix_fmt"),
+        "fps": fps,
+        "sar": video.get("sample_aspect_ratio", "1:1"),
+        "has_audio": audio is not None,
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "sample_rate": audio.get("sample_rate") if audio else None,
+        "channels": audio.get("channels") if audio else None,
+    }
+
+
+def _read_keyframes(path):
+    # Reads packet flags only (no decoding), returns (start_time, keyframes)
+    # where keyframes are (pts, dts) pairs relative to the start of the file.
+    probe = ffmpeg.probe(
+        path, select_streams="v:0", show_entries="packet=pts_time,dts_time,flags"
+    )
+    start_time = float(probe.get("format", {}).get("start_time", 0) or 0)
+    keyframes = []
+    for packet in probe.get("packets", []):
+        pts_time = packet.get("pts_time")
+        if pts_time is None or "K" not in packet.get("flags", ""):
+            continue
+        dts_time = packet.get("dts_time", pts_time)
+        keyframes.append((float(pts_time) - start_time, float(dts_time) - start_time))
+    return start_time, sorted(keyframes)
+
+
+class ProbeCache:
+    # ffprobe results keyed by (path, size, mtime) so a rewritten file is
+    # probed again, with least recently used entries evicted first.
+    # Cached values are shared between callers and must not be mutated.
+
+    def __init__(self, max_entries=1024, max_workers=8):
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self._media = OrderedDict()
+        self._keyframes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, store, path, loader, what):
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"[Video Concatenation] Cannot probe {path}: {e}")
+            return None
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            if key in store:
+                store.move_to_end(key)
+                return store[key]
+
+        try:
+            value = loader(path)
+        except ffmpeg.Error as e:
+            print(
+                f"[Video Concatenation] Error probing {what} of {path}: {e.stderr.decode() if e.stderr else str(e)}"
+            )
+            return None
+        except Exception as e:
+            print(f"[Video Concatenation] Error probing {what} of {path}: {e}")
+            return None
+
+        if value is not None:
+            with self._lock:
+                store[key] = value
+                store.move_to_end(key)
+                while len(store) > self.max_entries:
+                    store.popitem(last=False)
+        return value
+
+    def _map(self, fn, paths):
+        # ffprobe is a separate process, so threads are enough to overlap them
+        paths = list(paths)
+        if len(paths) <= 1:
+            return [fn(p) for p in paths]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as pool:
+            return list(pool.map(fn, paths))
+
+    def probe(self, path):
+        return self._cached(self._media, path, _read_media_info, "streams")
+
+    def probe_many(self, paths):
+        return self._map(self.probe, paths)
+
+    def keyframes(self, path):
+        return self._cached(self._keyframes, path, _read_keyframes, "keyframes")
+
+    def keyframes_many(self, paths):
+        return self._map(self.keyframes, paths)
+
+    def clear(self):
+        with self._lock:
+            self._media.clear()
+            self._keyframes.clear()
+
+
+_PROBE_CACHE = ProbeCache()
+
+
+def probe_media(path):
+    return _PROBE_CACHE.probe(path)
+
+
+def probe_media_many(paths):
+    return _PROBE_CACHE.probe_many(paths)
+
+
+def get_keyframes(path):
+    return _PROBE_CACHE.keyframes(path)
+
+
+def get_keyframes_many(paths):
+    return _PROBE_CACHE.keyframes_many(paths)
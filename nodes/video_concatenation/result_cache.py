@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+import folder_paths
+from .temp_artifacts import get_temp_artifacts
+
+# Disk budget for cached concatenation results, in MB
+_DEFAULT_BUDGET_MB = int(os.environ.get("COMFY_AUTOMATION_CONCAT_CACHE_MB", "10240"))
+
+# Partial outputs (and their work dirs) untouched this long were left by a
+# job that crashed or was killed; a running encode keeps writing to them
+_STALE_PARTIAL_SECONDS = 6 * 3600
+
+
+def file_identity(path):
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+class ResultCache:
+    # Finished outputs stored as <key>.<ext> (plus a <key>.json sidecar with
+    # the plan), where the key hashes the input file identities and every
+    # option that changes the result. A hit bumps the file's mtime, and the
+    # least recently used entries are evicted once the budget is exceeded.
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def make_key(self, video_paths, options):
+        payload = {
+            "inputs": [file_identity(p) for p in video_paths],
+            "options": options,
+        }
+        data = json.dumps(payload, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def _paths(self, key, ext):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.{ext}", f"{base}.json"
+
+    def lookup(self, key, ext):
+        # Returns (video_path, plan_text) or None
+        video_path, meta_path = self._paths(key, ext)
+        with self._lock:
+            if not os.path.exists(video_path):
+                return None
+            os.utime(video_path)
+        plan_text = ""
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                plan_text = json.load(f).get("plan", "")
+        except (OSError, ValueError):
+            pass
+        return video_path, plan_text
+
+    def reserve(self, key, ext):
+        # Path to encode into; store() moves it in place when complete. Unique
+        # per job, so two jobs missing the same key never write one file.
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f"{key}.partial_{uuid.uuid4().hex}.{ext}")
+
+    def store(self, key, ext, partial_path, plan_text):
+        video_path, meta_path = self._paths(key, ext)
+        with self._lock:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"plan": plan_text}, f)
+            os.replace(partial_path, video_path)
+        self.evict(keep=video_path)
+        return video_path
+
+    def _sweep_partial(self, path, now):
+        # Size of a live partial entry, 0 once a stale one is removed
+        try:
+            size = os.path.getsize(path) if os.path.isfile(path) else 0
+            if get_temp_artifacts().is_referenced(path):
+                return size
+            if now - os.path.getmtime(path) < _STALE_PARTIAL_SECONDS:
+                return size
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            return 0
+        print(f"[Video Concatenation] Removed abandoned partial result {path}")
+        return 0
+
+    def evict(self, keep=None):
+        with self._lock:
+            entries = []
+            total = 0
+            now = time.time()
+            for name in os.listdir(self.cache_dir):
+                key, dot, ext = name.partition(".")
+                path = os.path.join(self.cache_dir, name)
+                if ext.startswith("partial_"):
+                    # In-flight results count against the budget, but only
+                    # finished ones are evicted
+                    total += self._sweep_partial(path, now)
+                    continue
+                if not dot or "." in ext or ext == "json" or not os.path.isfile(path):
+                    continue
+                st = os.stat(path)
+                total += st.st_size
+                entries.append((st.st_mtime, path, key))
+
+            entries.sort()
+            for _, path, key in entries:
+                if total <= self.max_bytes:
+                    break
+                # Results still held by a live VIDEO output stay on disk
+                if path == keep or get_temp_artifacts().is_referenced(path):
+                    continue
+                total -= os.path.getsize(path)
+                os.remove(path)
+                meta_path = os.path.join(self.cache_dir, f"{key}.json")
+                if os.path.exists(meta_path):
+                    os.remove(meta_path)
+                print(f"[Video Concatenation] Evicted cached result {path}")
+
+
+_RESULT_CACHE = None
+
+
+def get_result_cache():
+    global _RESULT_CACHE
+    if _RESULT_CACHE is None:
+        _RESULT_CACHE = ResultCache(
+            os.path.join(folder_paths.get_temp_directory(), "concat_cache"),
+            _DEFAULT_BUDGET_MB * 1024 * 1024,
+        )
+    return _RESULT_CACHE
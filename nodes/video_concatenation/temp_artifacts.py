@@ -0,0 +1,134 @@
+import os
+import time
+import uuid
+import shutil
+import weakref
+import threading
+import folder_paths
+
+# Disk budget for concatenation and append outputs in the temp directory, in MB
+_DEFAULT_QUOTA_MB = int(os.environ.get("COMFY_AUTOMATION_TEMP_QUOTA_MB", "20480"))
+
+# Top-level temp entries this suite writes; anything else is left alone
+_MANAGED_PREFIXES = ("concat_temp_", "concat_frames_", "append_")
+
+
+def _entry_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class TempArtifacts:
+    # Names, reference tracking and a disk quota for outputs in the temp
+    # directory. A file is referenced while a live VideoOutput points at it
+    # (ComfyUI keeps node outputs alive while they are cached) or while it is
+    # pinned, e.g. the running output of an unfinished Video Append or the
+    # output of a job still running. Work dirs named after a pinned output
+    # (<stem>_batches, <stem>_parts, ...) are pinned with it. Once the quota
+    # is exceeded the least recently modified unreferenced entries go.
+
+    def __init__(self, temp_dir, max_bytes):
+        self.temp_dir = temp_dir
+        self.max_bytes = max_bytes
+        self._refs = {}  # abs path -> live VideoOutput count
+        self._pinned = set()
+        # Reentrant: a weakref callback can run during GC inside a locked section
+        self._lock = threading.RLock()
+
+    def allocate(self, prefix, ext):
+        # Timestamp for readability, random suffix so jobs started in the
+        # same second (or by another instance) never share a name. The path
+        # stays pinned until the job unpins it.
+        os.makedirs(self.temp_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        name = f"{prefix}_{stamp}_{uuid.uuid4().hex[:12]}.{ext}"
+        path = os.path.join(self.temp_dir, name)
+        self.pin(path)
+        return path
+
+    def track(self, owner, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._refs[path] = self._refs.get(path, 0) + 1
+        weakref.finalize(owner, self._release, path)
+
+    def _release(self, path):
+        with self._lock:
+            count = self._refs.get(path, 0) - 1
+            if count > 0:
+                self._refs[path] = count
+            else:
+                self._refs.pop(path, None)
+
+    def pin(self, *paths):
+        with self._lock:
+            self._pinned.update(os.path.abspath(p) for p in paths)
+
+    def unpin(self, *paths):
+        with self._lock:
+            self._pinned.difference_update(os.path.abspath(p) for p in paths)
+
+    def is_referenced(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._refs or path in self._pinned:
+                return True
+            return any(
+                path.startswith(os.path.splitext(p)[0] + "_") for p in self._pinned
+            )
+
+    def enforce_quota(self):
+        with self._lock:
+            try:
+                names = os.listdir(self.temp_dir)
+            except OSError:
+                return
+            entries = []
+            total = 0
+            for name in names:
+                if not name.startswith(_MANAGED_PREFIXES):
+                    continue
+                path = os.path.join(self.temp_dir, name)
+                try:
+                    size = _entry_size(path)
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                total += size
+                entries.append((mtime, path, size))
+
+            entries.sort()
+            for _, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if self.is_referenced(path):
+                    continue
+                try:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                print(f"[Video Concatenation] Evicted temp output {path}")
+
+
+_TEMP_ARTIFACTS = None
+
+
+def get_temp_artifacts():
+    global _TEMP_ARTIFACTS
+    if _TEMP_ARTIFACTS is None:
+        _TEMP_ARTIFACTS = TempArtifacts(
+            folder_paths.get_temp_directory(), _DEFAULT_QUOTA_MB * 1024 * 1024
+        )
+    return _TEMP_ARTIFACTS
@@ -0,0 +1,166 @@
+import os
+import shutil
+import ffmpeg
+from .encoder_profiles import DEFAULT_PROFILE
+from .ffmpeg_process import get_matching_encoder_args, stream_copy_concat
+from .ffmpeg_runner import run_ffmpeg
+from .probe_cache import get_keyframes_many
+
+# The concat demuxer drops packets by DTS at an outpoint, so a copied piece has
+# to stop just before the keyframe's DTS or reordered B-frames leak through.
+# ffprobe prints times rounded to microseconds, hence the small margin.
+_OUTPOINT_MARGIN = 0.0001
+
+
+def plan_transition_cuts(video_durations, keyframes, transition_time):
+    # For every clip pick where its stream-copied middle starts (first keyframe
+    # after the incoming transition) and ends (last keyframe before the
+    # outgoing one). Everything outside those cuts goes into a transition
+    # window that gets re-encoded. Cuts are (pts, dts) pairs; the dts is None
+    # where a cut is the clip's own start or end. Returns None if a clip has
+    # no usable middle.
+    cuts = []
+    last = len(video_durations) - 1
+    for i, duration in enumerate(video_durations):
+        head = (0.0, None)
+        tail = (duration, None)
+        if i > 0:
+            head = next((k for k in keyframes[i] if k[0] >= transition_time), None)
+        if i < last:
+            tail = next(
+                (
+                    k
+                    for k in reversed(keyframes[i])
+                    if k[0] <= duration - transition_time
+                ),
+                None,
+            )
+        if head is None or tail is None or head[0] > tail[0]:
+            return None
+        cuts.append((head, tail))
+    return cuts
+
+
+def encode_transition_window(
+    prev_path,
+    prev_duration,
+    prev_tail,
+    next_path,
+    next_head,
+    output_path,
+    transition_type,
+    transition_time,
+    encoder_args,
+    has_audio,
+):
+    # Window = prev clip from its tail cut to the end, crossfaded into the next
+    # clip up to its head cut. The xfade offset is the same point on the
+    # timeline as in the full-graph xfade, just shifted by the tail cut.
+    prev_input = ffmpeg.input(prev_path, ss=prev_tail)
+    next_input = ffmpeg.input(next_path, t=next_head)
+
+    # xfade refuses inputs with different time bases, which clips of the
+    # same frame rate can still have (e.g. 1/12288 vs 1/90000)
+    video = ffmpeg.filter(
+        [
+            prev_input.video.filter("settb", "AVTB"),
+            next_input.video.filter("settb", "AVTB"),
+        ],
+        "xfade",
+        transition=transition_type,
+        duration=transition_time,
+        offset=prev_duration - transition_time - prev_tail,
+    )
+    streams = [video]
+    if has_audio:
+        streams.append(
+            ffmpeg.filter(
+                [prev_input.audio, next_input.audio], "acrossfade", d=transition_time
+            )
+        )
+
+    run_ffmpeg(
+        ffmpeg.output(*streams, output_path, **encoder_args).overwrite_output(),
+        output_path,
+        label="transition window",
+    )
+
+
+def segmented_xfade_concat(
+    video_paths,
+    output_path,
+    output_format,
+    transition_type,
+    transition_time,
+    video_durations,
+    stream_infos,
+    profile=DEFAULT_PROFILE,
+):
+    # Requires stream compatible inputs (see can_stream_copy): only the
+    # transition windows are re-encoded, the middles of every clip are
+    # stream-copied and the pieces are joined with the concat demuxer.
+    encoder_args = get_matching_encoder_args(stream_infos[0], output_format, profile)
+    if encoder_args is None:
+        print(
+            f"[Video Concatenation] No matching encoder for {stream_infos[0]['video_codec']}, cannot segment transitions"
+        )
+        return False
+
+    probed = get_keyframes_many(video_paths)
+    if any(p is None for p in probed):
+        return False
+    start_times = [start_time for start_time, _ in probed]
+    keyframes = [kf for _, kf in probed]
+
+    cuts = plan_transition_cuts(video_durations, keyframes, transition_time)
+    if cuts is None:
+        print(
+            "[Video Concatenation] Clips too short for their keyframe spacing, cannot segment transitions"
+        )
+        return False
+
+    has_audio = stream_infos[0]["audio_codec"] is not None
+    ext = os.path.splitext(output_path)[1]
+    work_dir = os.path.splitext(output_path)[0] + "_segments"
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        entries = []
+        last = len(video_paths) - 1
+        for i, v in enumerate(video_paths):
+            head, tail = cuts[i]
+            if tail[0] > head[0]:
+                entry = {"path": v, "duration": tail[0] - head[0]}
+                if i > 0:
+                    entry["inpoint"] = start_times[i] + head[0]
+                if i < last:
+                    entry["outpoint"] = start_times[i] + tail[1] - _OUTPOINT_MARGIN
+                entries.append(entry)
+
+            if i < last:
+                window_path = os.path.join(work_dir, f"window_{i:05d}{ext}")
+                encode_transition_window(
+                    v,
+                    video_durations[i],
+                    tail[0],
+                    video_paths[i + 1],
+                    cuts[i + 1][0][0],
+                    window_path,
+                    transition_type,
+                    transition_time,
+                    encoder_args,
+                    has_audio,
+                )
+                entries.append(window_path)
+
+        print(
+            f"[Video Concatenation] Re-encoded {last} transition windows, joining segments with stream copy"
+        )
+        return stream_copy_concat(entries, output_path)
+    except ffmpeg.Error as e:
+        print(
+            f"[Video Concatenation] Segmented xfade failed: {e.stderr.decode() if e.stderr else str(e)}"
+        )
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,117 @@
+import os
+import re
+import shutil
+from ...core import _VIDEO_APPEND_STATE
+from ...metrics import timed_stage
+from .video_output import VideoOutput
+from .path_utils import (
+    describe_diagnostics,
+    extract_paths,
+    new_diagnostics,
+    resolve_video_paths,
+)
+from .incremental import append_clip, finish_append, new_append_state
+from .temp_artifacts import get_temp_artifacts
+from .video_concatenation import TRANSITION_TYPES
+
+
+class VideoAppend:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "video": ("VIDEO",),
+                "iterator_id": ("STRING", {"default": "default_iterator"}),
+                "transition_type": (TRANSITION_TYPES, {"default": "none"}),
+                "transition_time": (
+                    "FLOAT",
+                    {"default": 1.0, "min": 0.1, "max": 10.0, "step": 0.1},
+                ),
+                "output_format": (
+                    ["mp4", "mkv", "mov", "webm", "avi", "gif"],
+                    {"default": "mp4"},
+                ),
+            },
+            "optional": {
+                "is_finished": ("BOOLEAN", {"default": False}),
+                "reset": ("BOOLEAN", {"default": False}),
+            },
+        }
+
+    RETURN_TYPES = ("VIDEO", "BOOLEAN")
+    RETURN_NAMES = ("video", "is_finished")
+    OUTPUT_NODE = True
+    FUNCTION = "append"
+    CATEGORY = "Video Concatenation"
+
+    def append(
+        self,
+        video,
+        iterator_id,
+        transition_type,
+        transition_time,
+        output_format,
+        is_finished=False,
+        reset=False,
+    ):
+        global _VIDEO_APPEND_STATE
+        temp_artifacts = get_temp_artifacts()
+
+        # A finished run (or a format change) starts a new running output
+        state = _VIDEO_APPEND_STATE.get(iterator_id)
+        if (
+            reset
+            or state is None
+            or state["finished"]
+            or state["output_format"] != output_format
+        ):
+            if state is not None:
+                # An unfinished run is abandoned; a finished one already
+                # cleaned up, and its output belongs to the VIDEO it returned
+                temp_artifacts.unpin(state["output_path"], state["work_dir"])
+                shutil.rmtree(state["work_dir"], ignore_errors=True)
+            # Every run gets its own output, so a new run never rewrites a
+            # previous result and ids that sanitize alike never share a file.
+            # allocate() pins it (and the parts dir) until the run ends.
+            safe_id = re.sub(r"[^\w.-]", "_", iterator_id)
+            state = new_append_state(
+                temp_artifacts.allocate(f"append_{safe_id}", output_format),
+                output_format,
+            )
+            _VIDEO_APPEND_STATE[iterator_id] = state
+            temp_artifacts.enforce_quota()
+
+        diagnostics = new_diagnostics()
+        clips = resolve_video_paths(extract_paths(video, diagnostics), diagnostics)
+        if not clips:
+            print(
+                f"[Video Concatenation] VideoAppend: No valid video to append for {iterator_id} ({describe_diagnostics(diagnostics)})"
+            )
+
+        for clip in clips:
+            with timed_stage("append"):
+                appended = append_clip(state, clip, transition_type, transition_time)
+            if not appended:
+                print(
+                    f"[Video Concatenation] VideoAppend: Could not append {clip} to {iterator_id}"
+                )
+
+        print(
+            f"[Video Concatenation] VideoAppend: {iterator_id} has {len(state['clips'])} clips (Finished: {is_finished})"
+        )
+        if not is_finished:
+            # The video is only joined at the end; until then the clip of
+            # this iteration is passed on, e.g. for a preview
+            if not clips:
+                return (None, is_finished)
+            return (VideoOutput(clips[-1]), is_finished)
+
+        state["finished"] = True
+        with timed_stage("save"):
+            finished = finish_append(state)
+        # Only the returned VIDEO keeps the finished output now
+        temp_artifacts.unpin(state["output_path"], state["work_dir"])
+        shutil.rmtree(state["work_dir"], ignore_errors=True)
+        if not finished or not os.path.exists(state["output_path"]):
+            return (None, is_finished)
+        return (VideoOutput(state["output_path"]), is_finished)
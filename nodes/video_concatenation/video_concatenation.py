@@ -1,9 +1,43 @@
 import os
-import datetime
-import folder_paths
+import json
+import hashlib
 from .video_output import VideoOutput
-from .path_utils import extract_paths, resolve_video_paths
-from .ffmpeg_process import probe_video, simple_concat, xfade_concat
+from .path_utils import (
+    describe_diagnostics,
+    expand_video_source,
+    extract_paths,
+    new_diagnostics,
+    resolve_video_paths,
+)
+from ...metrics import timed_stage
+from .chunked_encode import ENCODE_ENGINES
+from .encoder_profiles import DEFAULT_PROFILE, get_encoder_profiles
+from .concat_engine import concat_videos
+from .concat_plan import pick_reference
+from .frame_pipe import encode_image_batch
+from .probe_cache import probe_media_many
+from .result_cache import file_identity, get_result_cache
+from .temp_artifacts import get_temp_artifacts
+
+TRANSITION_TYPES = [
+    "none",
+    "fade",
+    "slideleft",
+    "slideright",
+    "slideup",
+    "slidedown",
+    "wipeleft",
+    "wiperight",
+    "wipeup",
+    "wipedown",
+    "dissolve",
+    "circlecrop",
+    "rectcrop",
+    "distance",
+    "radial",
+    "pixelize",
+    "hblur",
+]
 
 
 class VideoConcatenation:
@@ -11,28 +45,7 @@ class VideoConcatenation:
     def INPUT_TYPES(s):
         return {
             "required": {
-                "transition_type": (
-                    [
-                        "none",
-                        "fade",
-                        "slideleft",
-                        "slideright",
-                        "slideup",
-                        "slidedown",
-                        "wipeleft",
-                        "wiperight",
-                        "wipeup",
-                        "wipedown",
-                        "dissolve",
-                        "circlecrop",
-                        "rectcrop",
-                        "distance",
-                        "radial",
-                        "pixelize",
-                        "hblur",
-                    ],
-                    {"default": "none"},
-                ),
+                "transition_type": (TRANSITION_TYPES, {"default": "none"}),
                 "transition_time": (
                     "FLOAT",
                     {"default": 1.0, "min": 0.1, "max": 10.0, "step": 0.1},
@@ -43,108 +56,199 @@ class VideoConcatenation:
                 ),
             },
             "optional": {
+                "concat_mode": (["auto", "re_encode"], {"default": "auto"}),
                 "video1": ("VIDEO",),
                 "video2": ("VIDEO",),
                 "video3": ("VIDEO",),
                 "video4": ("VIDEO",),
                 "video5": ("VIDEO",),
+                "video_list": ("*",),
+                "video_source": ("STRING", {"default": ""}),
+                "max_batch_size": ("INT", {"default": 32, "min": 2, "max": 512}),
+                "images": ("IMAGE",),
+                "images_fps": (
+                    "FLOAT",
+                    {"default": 24.0, "min": 1.0, "max": 120.0, "step": 1.0},
+                ),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                "encode_engine": (ENCODE_ENGINES, {"default": "serial"}),
+                "encoder_profile": (
+                    get_encoder_profiles().names(),
+                    {"default": DEFAULT_PROFILE},
+                ),
             },
         }
 
-    RETURN_TYPES = ("VIDEO",)
-    RETURN_NAMES = ("video",)
+    RETURN_TYPES = ("VIDEO", "STRING")
+    RETURN_NAMES = ("video", "plan")
     OUTPUT_NODE = False
     FUNCTION = "merge_videos"
     CATEGORY = "Video Concatenation"
 
+    @classmethod
+    def IS_CHANGED(s, video_source="", **kwargs):
+        # Files behind a directory/glob source can change while the widget
+        # value stays the same; linked inputs are covered by ComfyUI itself
+        paths = expand_video_source(video_source)
+        if not paths:
+            return ""
+        identities = [file_identity(p) for p in paths]
+        return hashlib.sha256(json.dumps(identities).encode("utf-8")).hexdigest()
+
     def merge_videos(self, **kwargs):
         # Collect all provided video paths
+        diagnostics = new_diagnostics()
         video_list = []
-        for i in range(1, 6):
-            v = kwargs.get(f"video{i}")
+        for name in [f"video{i}" for i in range(1, 6)] + ["video_list"]:
+            v = kwargs.get(name)
             if v is None:
                 continue
+            video_list.extend(extract_paths(v, diagnostics))
 
-            print(f"[Video Concatenation] Concatenation input video{i} type: {type(v)}")
-
-            extracted = extract_paths(v)
-            if not extracted:
-                print(
-                    f"[Video Concatenation] Concatenation input video{i} could not be parsed: {v}"
-                )
-            video_list.extend(extracted)
+        # Directory or glob source, already absolute and sorted
+        video_list.extend(expand_video_source(kwargs.get("video_source", "")))
 
-        if not video_list:
+        images = kwargs.get("images")
+        if not video_list and images is None:
             print(
                 "[Video Concatenation] VideoConcatenation: No video paths recognized in the inputs"
             )
-            return (None,)
+            return (None, "")
 
         # Resolve paths
-        valid_videos = resolve_video_paths(video_list)
+        with timed_stage("resolve"):
+            valid_videos = resolve_video_paths(video_list, diagnostics)
+        print(
+            f"[Video Concatenation] Inputs: {len(valid_videos)} clips ({describe_diagnostics(diagnostics)})"
+        )
 
-        if not valid_videos:
+        if not valid_videos and images is None:
             print(
                 "[Video Concatenation] VideoConcatenation: No valid video files found on disk among the recognized paths"
             )
-            return (None,)
+            return (None, "")
 
-        # Get output directory from ComfyUI (used for temp file)
-        output_dir = folder_paths.get_temp_directory()
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir, exist_ok=True)
+        temp_artifacts = get_temp_artifacts()
 
-        # Generate temp filename
-        today = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
         output_format = kwargs.get("output_format", "mp4")
-        output_path = os.path.join(output_dir, f"concat_temp_{today}.{output_format}")
-
-        # Probe video durations if transitions are enabled
-        transition_mode = kwargs.get("transition_type", "none")
+        transition_type = kwargs.get("transition_type", "none")
         transition_time = kwargs.get("transition_time", 1.0)
-
-        # Validate probing
-        video_durations = []
-        if transition_mode != "none":
-            for v_path in valid_videos:
-                duration = probe_video(v_path)
-                if duration is not None:
-                    video_durations.append(duration)
-                else:
-                    # Fallback to none if probing fails
-                    transition_mode = "none"
-                    break
-
-        print(
-            f"[Video Concatenation] Merging {len(valid_videos)} videos... (Transition: {transition_mode})"
-        )
-
-        success = False
-        if transition_mode == "none":
-            success = simple_concat(valid_videos, output_path, output_format)
-        else:
-            success = xfade_concat(
+        concat_mode = kwargs.get("concat_mode", "auto")
+        max_batch_size = kwargs.get("max_batch_size", 32)
+        encode_engine = kwargs.get("encode_engine", "serial")
+        encoder_profile = kwargs.get("encoder_profile", DEFAULT_PROFILE)
+
+        # Same input files and options give the same result, so a cached
+        # output can be returned without running ffmpeg at all. IMAGE input
+        # has no cheap identity and is never cached.
+        cache = None
+        if kwargs.get("use_cache", True) and images is None:
+            cache = get_result_cache()
+            cache_key = cache.make_key(
                 valid_videos,
-                output_path,
-                output_format,
-                transition_mode,
-                transition_time,
-                video_durations,
+                {
+                    "transition_type": transition_type,
+                    "transition_time": transition_time,
+                    "output_format": output_format,
+                    "concat_mode": concat_mode,
+                    "max_batch_size": max_batch_size,
+                    "encode_engine": encode_engine,
+                    "encoder_profile": encoder_profile,
+                    # Editing a profile in the file changes its output too
+                    "encoder_settings": get_encoder_profiles().get(encoder_profile),
+                },
             )
-            if not success:
-                print(
-                    f"[Video Concatenation] Xfade failed, falling back to simple concat video only."
-                )
-                # The original code had a fallback to video-only simple concat if audio stuff failed in xfade path.
-                # My ffmpeg_process wrapper handles exceptions but returns False.
-                # Let's try the video-only simple concat if xfade returned False.
-                from .ffmpeg_process import simple_concat_video_only
-
-                success = simple_concat_video_only(
-                    valid_videos, output_path, output_format
-                )
-
-        if success and os.path.exists(output_path):
-            return (VideoOutput(output_path),)
-
-        return (None,)
+            hit = cache.lookup(cache_key, output_format)
+            if hit is not None:
+                print(f"[Video Concatenation] Cache hit, reusing {hit[0]}")
+                return (VideoOutput(hit[0]), hit[1])
+            output_path = cache.reserve(cache_key, output_format)
+
+        # Unique temp filename, so concurrent jobs never write the same file.
+        # Allocated paths (and their work dirs) stay pinned while the job
+        # runs, so another job's quota sweep never removes them.
+        if cache is None:
+            output_path = temp_artifacts.allocate("concat_temp", output_format)
+        else:
+            temp_artifacts.pin(output_path)
+        frames_path = None
+        try:
+            # Probing here fills the probe cache, so the probe stage is timed
+            # on its own and concat_videos finds every input already probed
+            with timed_stage("probe"):
+                stream_infos = probe_media_many(valid_videos)
+
+            # IMAGE frames are piped straight into ffmpeg. Alone they are
+            # encoded into the output itself; otherwise into the stream layout
+            # of the reference clip, so the join can copy them instead of
+            # encoding the frames a second time.
+            if images is not None:
+                if not valid_videos:
+                    with timed_stage("encode"):
+                        success = encode_image_batch(
+                            images,
+                            output_path,
+                            output_format,
+                            kwargs.get("images_fps", 24.0),
+                            profile=encoder_profile,
+                        )
+                    if not success or not os.path.exists(output_path):
+                        return (None, "")
+                    result = VideoOutput(output_path)
+                    temp_artifacts.enforce_quota()
+                    return (
+                        result,
+                        "mode: frames\n- IMAGE frames encoded straight into the output",
+                    )
+
+                reference = None
+                if all(stream_infos):
+                    index = pick_reference(stream_infos, output_format)
+                    reference = stream_infos[index] if index is not None else None
+                frames_path = temp_artifacts.allocate("concat_frames", output_format)
+                if encode_image_batch(
+                    images,
+                    frames_path,
+                    output_format,
+                    kwargs.get("images_fps", 24.0),
+                    profile=encoder_profile,
+                    reference=reference,
+                ):
+                    valid_videos.append(frames_path)
+
+            try:
+                with timed_stage("encode"):
+                    success, plan_text = concat_videos(
+                        valid_videos,
+                        output_path,
+                        output_format,
+                        transition_type,
+                        transition_time,
+                        concat_mode,
+                        max_batch_size,
+                        encode_engine,
+                        encoder_profile,
+                    )
+            finally:
+                if frames_path:
+                    temp_artifacts.unpin(frames_path)
+                    if os.path.exists(frames_path):
+                        os.remove(frames_path)
+
+            if success and os.path.exists(output_path):
+                result_path = output_path
+                if cache is not None:
+                    result_path = cache.store(
+                        cache_key, output_format, output_path, plan_text
+                    )
+                result = VideoOutput(result_path)
+                # Make room for the next job; this result is referenced now
+                temp_artifacts.enforce_quota()
+                return (result, plan_text)
+
+            return (None, plan_text)
+        finally:
+            temp_artifacts.unpin(output_path)
+            # A reserved cache path is only left behind by a failed job
+            if cache is not None and os.path.exists(output_path):
+                os.remove(output_path)
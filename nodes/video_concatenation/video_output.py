@@ -1,41 +1,120 @@
+import os
 import ffmpeg
 import shutil
+from ...metrics import timed_stage
+from .ffmpeg_runner import FFmpegCancelled, run_ffmpeg
+from .ffmpeg_process import _MATCHING_VIDEO_ENCODERS
+from .probe_cache import probe_media
+from .temp_artifacts import get_temp_artifacts
+
+# ioctl request for a copy-on-write clone (btrfs, XFS, bcachefs, ...)
+_FICLONE = 0x40049409
+
+# Extensions that name the same container
+_CONTAINER_ALIASES = {"m4v": "mp4", "mkv": "matroska", "qt": "mov"}
+
+
+def _option_value(value):
+    # SaveVideo passes Types.VideoContainer / Types.VideoCodec enums;
+    # None and "auto" mean "keep whatever the file already is"
+    value = getattr(value, "value", value)
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    if value in ("", "auto"):
+        return None
+    return value
+
+
+def _container(name):
+    name = name.lower().lstrip(".")
+    return _CONTAINER_ALIASES.get(name, name)
+
+
+def _reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def place_file(src, dst):
+    # Puts an identical file at dst without rewriting the data when the
+    # filesystem allows it. The source is left in place: the same VIDEO can
+    # feed several save nodes and may belong to the result cache.
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+    if _reflink(src, dst):
+        return "reflink"
+    shutil.copyfile(src, dst)
+    return "copy"
 
 
 class VideoOutput:
     def __init__(self, video_path):
         self.video_path = video_path
+        # Keeps the file out of temp/cache eviction while this object lives
+        get_temp_artifacts().track(self, video_path)
 
     def get_dimensions(self):
-        try:
-            probe = ffmpeg.probe(self.video_path)
-            video_info = next(s for s in probe["streams"] if s["codec_type"] == "video")
-            return int(video_info["width"]), int(video_info["height"])
-        except Exception:
+        info = probe_media(self.video_path)
+        if info is None:
             return 0, 0
+        return info["width"], info["height"]
 
     def save_to(self, path, format=None, codec=None, metadata=None):
-        # Simply copy the concatenation result to the final path
-        # If format conversion is requested by SaveVideo, we might need ffmpeg here
-        # But usually VideoConcatenation already did the hard work.
+        with timed_stage("save"):
+            self._save_to(path, format, codec)
 
-        # Determine if we need to re-encode or just copy
-        # The internal file is already in a temp path with a format.
-        try:
-            # We will use ffmpeg to ensure the target format/codec is respected
-            # if provided by the save node.
+    def _save_to(self, path, format, codec):
+        # The container is the requested format or, for "auto", whatever
+        # extension SaveVideo chose for the destination
+        source_container = _container(os.path.splitext(self.video_path)[1])
+        target = _option_value(format) or os.path.splitext(path)[1]
+        remux = bool(target) and _container(target) != source_container
 
-            stream = ffmpeg.input(self.video_path)
-            # Basic copy if no specific codec requested or if it matches
-            output_args = {"c": "copy"}
+        # Only re-encode when a codec other than the file's is requested
+        vcodec = None
+        wanted_codec = _option_value(codec)
+        if wanted_codec is not None:
+            info = probe_media(self.video_path)
+            if info is None or info["video_codec"] != wanted_codec:
+                vcodec = _MATCHING_VIDEO_ENCODERS.get(wanted_codec, wanted_codec)
+
+        if not remux and vcodec is None:
+            method = place_file(self.video_path, path)
+            print(f"[Video Concatenation] Saved {path} ({method})")
+            return
 
-            # If codec/format is strictly requested by the SaveVideo node (which usually passes objects)
-            # The 'format' arg here is likely a complicated Comfy object based on the traceback (Types.VideoContainer)
-            # We'll do a simple copy for now as a robust baseline,
-            # assuming the user set the right extension in VideoConcatenation.
-            # If strictly needed, we can re-encode.
+        try:
+            output_args = {"c": "copy"}
+            if vcodec is not None:
+                output_args = {"vcodec": vcodec, "acodec": "copy"}
+            if _option_value(format):
+                output_args["format"] = _container(target)
 
-            ffmpeg.output(stream, path, **output_args).overwrite_output().run()
+            run_ffmpeg(
+                ffmpeg.output(
+                    ffmpeg.input(self.video_path), path, **output_args
+                ).overwrite_output(),
+                path,
+                label="save",
+            )
+        except FFmpegCancelled:
+            raise
         except Exception as e:
             print(f"[Video Concatenation] Error saving to final path: {e}")
             # Fallback copy
@@ -0,0 +1,290 @@
+import os
+import json
+import sqlite3
+import itertools
+import threading
+import time
+from .metrics import logger
+
+# "memory" keeps loop positions for the life of the server process,
+# "sqlite" persists them so a restart resumes where the loop stopped
+_BACKEND = os.environ.get("COMFY_AUTOMATION_STATE_BACKEND", "memory").lower()
+_STATE_PATH = os.environ.get("COMFY_AUTOMATION_STATE_PATH", "")
+# Iterators untouched for this long are dropped (0 keeps them forever)
+_STATE_TTL_HOURS = float(os.environ.get("COMFY_AUTOMATION_STATE_TTL_HOURS", "24"))
+
+
+def new_record():
+    return {"index": 0}
+
+
+class MemoryStateStore:
+    # Iterator records (small dicts, "index" being the loop position)
+    # kept in a dict guarded by one lock
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def get(self, iterator_id):
+        with self._lock:
+            return dict(self._records.get(iterator_id) or new_record())
+
+    def update(self, iterator_id, fn):
+        # Atomic read-modify-write: fn receives a copy of the record, changes
+        # it in place and may return a value that update() passes back
+        with self._lock:
+            record = dict(self._records.get(iterator_id) or new_record())
+            result = fn(record)
+            self._records[iterator_id] = record
+            return result
+
+    def delete(self, iterator_id):
+        with self._lock:
+            self._records.pop(iterator_id, None)
+
+    def ids(self):
+        with self._lock:
+            return list(self._records)
+
+
+class SQLiteStateStore:
+    # Same interface, one row per iterator in a WAL-mode database. An
+    # advance is a single-row upsert inside BEGIN IMMEDIATE, and
+    # synchronous=NORMAL keeps it cheap while surviving process crashes.
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS iterator_state ("
+            "iterator_id TEXT PRIMARY KEY, record TEXT NOT NULL)"
+        )
+
+    def _read(self, iterator_id):
+        row = self._conn.execute(
+            "SELECT record FROM iterator_state WHERE iterator_id = ?",
+            (iterator_id,),
+        ).fetchone()
+        record = new_record()
+        if row is not None:
+            try:
+                record.update(json.loads(row[0]))
+            except ValueError:
+                logger.warning(
+                    f"[Iterator] Ignoring unreadable state for {iterator_id}"
+                )
+        return record
+
+    def get(self, iterator_id):
+        with self._lock:
+            return self._read(iterator_id)
+
+    def update(self, iterator_id, fn):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so another process
+            # sharing the file cannot interleave between the read and write
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                record = self._read(iterator_id)
+                result = fn(record)
+                self._conn.execute(
+                    "INSERT INTO iterator_state (iterator_id, record) VALUES (?, ?) "
+                    "ON CONFLICT(iterator_id) DO UPDATE SET record = excluded.record",
+                    (iterator_id, json.dumps(record)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def delete(self, iterator_id):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM iterator_state WHERE iterator_id = ?", (iterator_id,)
+            )
+
+    def ids(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT iterator_id FROM iterator_state")
+            return [row[0] for row in rows]
+
+
+def _default_state_path():
+    try:
+        import folder_paths
+
+        base = folder_paths.get_user_directory()
+    except (ImportError, AttributeError):
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, "automation_iterator_state.db")
+
+
+def create_state_store(backend=None, path=None):
+    backend = (backend or _BACKEND).lower()
+    if backend == "sqlite":
+        path = path or _STATE_PATH or _default_state_path()
+        try:
+            return SQLiteStateStore(path)
+        except sqlite3.Error as e:
+            logger.warning(
+                f"[Iterator] Could not open state database {path} ({e}), keeping state in memory"
+            )
+    elif backend != "memory":
+        logger.warning(
+            f"[Iterator] Unknown state backend '{backend}', keeping state in memory"
+        )
+    return MemoryStateStore()
+
+
+class IteratorStateManager:
+    # Wraps a store with one lock per iterator_id, so loops sharing a
+    # server never wait on each other and each loop's advance is a
+    # compare-and-swap: the record remembers the prompt that last moved
+    # it, and a repeated signal from that prompt is a no-op.
+    _SWEEP_INTERVAL = 60.0
+
+    def __init__(self, store, ttl_seconds=_STATE_TTL_HOURS * 3600):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._locks = {}
+        self._last_used = {}
+        # Highest index already sitting in the prompt queue; in memory only,
+        # since the queue itself does not survive a restart
+        self._queued_until = {}
+        # Indices whose outputs already exist (skip_completed lists)
+        self._completed = {}
+        self._guard = threading.Lock()
+        self._next_sweep = 0.0
+
+    def _lock(self, iterator_id):
+        with self._guard:
+            self._last_used[iterator_id] = time.time()
+            lock = self._locks.get(iterator_id)
+            if lock is None:
+                lock = self._locks[iterator_id] = threading.Lock()
+            return lock
+
+    def get_index(self, iterator_id):
+        with self._lock(iterator_id):
+            return self.store.get(iterator_id)["index"]
+
+    def set_index(self, iterator_id, index, prompt_id=None):
+        def apply(record):
+            record["index"] = index
+            record["prompt_id"] = prompt_id
+            record["updated"] = time.time()
+            self._queued_until.pop(iterator_id, None)
+
+        with self._lock(iterator_id):
+            self.store.update(iterator_id, apply)
+        self.evict_idle()
+
+    def get_record(self, iterator_id):
+        with self._lock(iterator_id):
+            return self.store.get(iterator_id)
+
+    def set_total(self, iterator_id, total, step=None, shared=False):
+        # Number of items in the loop (lets advance() plan ahead), for
+        # batched lists how many items one execution consumes, and whether
+        # the items are claimed from the shared work list
+        def apply(record):
+            record["total"] = total
+            record["shared"] = shared
+            if step is not None:
+                record["step"] = step
+
+        with self._lock(iterator_id):
+            record = self.store.get(iterator_id)
+            if (
+                record.get("total") != total
+                or record.get("shared", False) != shared
+                or (step is not None and record.get("step", 1) != step)
+            ):
+                self.store.update(iterator_id, apply)
+
+    def set_completed(self, iterator_id, indices):
+        with self._lock(iterator_id):
+            self._completed[iterator_id] = set(indices)
+
+    def advance(self, iterator_id, index=None, step=None, prompt_id=None, lookahead=1):
+        # Marks the iteration at index (default: the stored one) as done.
+        # Returns (next_index, advanced, to_queue): advanced is False when
+        # prompt_id already advanced this iterator, and to_queue lists the
+        # indices not yet queued within lookahead iterations (only the next
+        # one while the loop length is unknown). step defaults to the one
+        # recorded by the list; indices marked completed are skipped.
+        def apply(record):
+            if prompt_id is not None and record.get("prompt_id") == prompt_id:
+                return record["index"], False, []
+            stride = step or record.get("step", 1)
+            current = record["index"] if index is None else index
+            total = record.get("total")
+            completed = self._completed.get(iterator_id, ())
+
+            # The next indices still to run, leaving out completed items
+            if total is None:
+                upcoming = itertools.count(current + stride, stride)
+            else:
+                upcoming = range(current + stride, total, stride)
+            upcoming = (i for i in upcoming if i not in completed)
+            planned = list(
+                itertools.islice(upcoming, lookahead if total is not None else 1)
+            )
+
+            record["index"] = planned[0] if planned else current + stride
+            record["prompt_id"] = prompt_id
+            record["updated"] = time.time()
+
+            queued_until = self._queued_until.get(iterator_id, current)
+            to_queue = [i for i in planned if i > queued_until]
+            if to_queue:
+                self._queued_until[iterator_id] = to_queue[-1]
+            return record["index"], True, to_queue
+
+        with self._lock(iterator_id):
+            result = self.store.update(iterator_id, apply)
+        self.evict_idle()
+        return result
+
+    def evict_idle(self, now=None):
+        now = now or time.time()
+        if self.ttl_seconds <= 0 or now < self._next_sweep:
+            return []
+        self._next_sweep = now + self._SWEEP_INTERVAL
+
+        # Idle time only counts while this process runs: a persisted record
+        # first seen after a restart starts its clock now, so server
+        # downtime never drops a loop that is about to resume
+        evicted = []
+        for iterator_id in self.store.ids():
+            with self._guard:
+                last_used = self._last_used.setdefault(iterator_id, now)
+                lock = self._locks.get(iterator_id)
+            if lock is not None and lock.locked():
+                continue
+            if now - last_used < self.ttl_seconds:
+                continue
+            with self._guard:
+                # Re-check under the guard; a concurrent user refreshes it
+                if now - self._last_used.get(iterator_id, 0.0) < self.ttl_seconds:
+                    continue
+                self._locks.pop(iterator_id, None)
+                self._last_used.pop(iterator_id, None)
+                self._queued_until.pop(iterator_id, None)
+                self._completed.pop(iterator_id, None)
+                self.store.delete(iterator_id)
+            evicted.append(iterator_id)
+
+        if evicted:
+            logger.info(
+                f"[Iterator] Dropped state of idle iterators: {', '.join(evicted)}"
+            )
+        return evicted
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules at the repo root that need no ComfyUI (work_claims) are imported
+# directly; run with --rootdir tests so the node package itself is not
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import time
+import pytest
+from work_claims import WorkClaims
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "claims.db")
+
+
+def test_claim_hands_out_lowest_free_index(db_path):
+    a = WorkClaims(db_path, worker="a")
+    b = WorkClaims(db_path, worker="b")
+    assert a.claim("it", 3) == (0, 2)
+    assert b.claim("it", 3) == (1, 2)
+    # An open claim comes back to the worker that holds it
+    assert a.claim("it", 3) == (0, 2)
+
+
+def test_claim_respects_step(db_path):
+    a = WorkClaims(db_path, worker="a")
+    assert a.claim("it", 6, step=2) == (0, 2)
+    a.complete("it")
+    assert a.claim("it", 6, step=2) == (2, 1)
+
+
+def test_complete_marks_only_own_claims(db_path):
+    a = WorkClaims(db_path, worker="a")
+    b = WorkClaims(db_path, worker="b")
+    a.claim("it", 2)
+    b.claim("it", 2)
+    assert a.complete("it") == 1
+    assert a.complete("it") == 0
+    # b's index is still leased, so a has nothing to claim but isn't done
+    assert a.claim("it", 2) is None
+    assert a.next_expiry("it", 2) is not None
+    assert b.complete("it") == 1
+    assert a.claim("it", 2) is None
+    assert a.next_expiry("it", 2) is None
+
+
+def test_remaining_counts_leased_indices(db_path):
+    a = WorkClaims(db_path, worker="a")
+    b = WorkClaims(db_path, worker="b")
+    a.claim("it", 2)
+    assert b.claim("it", 2) == (1, 1)
+    b.complete("it")
+    # Only a's own index is left, so its claim is the last one
+    assert a.claim("it", 2) == (0, 0)
+
+
+def test_expired_lease_is_claimed_again(db_path):
+    dead = WorkClaims(db_path, lease_seconds=0.05, worker="dead")
+    alive = WorkClaims(db_path, worker="alive")
+    assert dead.claim("it", 1) == (0, 0)
+    assert alive.claim("it", 1) is None
+    expiry = alive.next_expiry("it", 1)
+    assert expiry is not None and expiry <= time.time() + 0.05
+    time.sleep(0.1)
+    assert alive.claim("it", 1) == (0, 0)
+    assert alive.complete("it") == 1
+    # The dead worker's late completion doesn't count anymore
+    assert dead.complete("it") == 0
+
+
+def test_reset_forgets_claims(db_path):
+    a = WorkClaims(db_path, worker="a")
+    a.claim("it", 1)
+    a.complete("it")
+    a.claim("other", 1)
+    assert a.claim("it", 1) is None
+    a.reset("it")
+    assert a.claim("it", 1) == (0, 0)
+    # Other iterators keep their claims
+    assert a.claim("other", 1) == (0, 0)
+    assert a.complete("other") == 1
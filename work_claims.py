@@ -0,0 +1,150 @@
+import os
+import time
+import socket
+import sqlite3
+import threading
+
+# A claim not completed within this time is handed to the next worker
+_LEASE_MINUTES = float(os.environ.get("COMFY_AUTOMATION_CLAIM_LEASE_MINUTES", "30"))
+_CLAIMS_PATH = os.environ.get("COMFY_AUTOMATION_CLAIMS_PATH", "")
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkClaims:
+    # Shared work list for several ComfyUI processes: one row per claimed
+    # (iterator_id, index). A worker claims the lowest index that is neither
+    # done nor under a live lease, and marks it done once its Signal runs.
+    # Every change happens inside BEGIN IMMEDIATE, so two workers can never
+    # claim the same index.
+
+    def __init__(self, path, lease_seconds=_LEASE_MINUTES * 60, worker=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.worker = worker or worker_id()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS claims ("
+            "iterator_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "done INTEGER NOT NULL DEFAULT 0, worker TEXT, lease_until REAL, "
+            "PRIMARY KEY (iterator_id, idx))"
+        )
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def claim(self, iterator_id, total, step=1):
+        # Returns (index, remaining) or None when every index is done or
+        # held by a live lease. remaining counts the other indices not done
+        # yet, leased ones included, so a worker only sees 0 once nothing
+        # can come back to it. A worker asking again before completing gets
+        # its open claim back (with a fresh lease).
+        def apply(conn):
+            now = time.time()
+            rows = conn.execute(
+                "SELECT idx, done, worker, lease_until FROM claims WHERE iterator_id = ?",
+                (iterator_id,),
+            ).fetchall()
+            own = [
+                idx
+                for idx, done, worker, _ in rows
+                if not done and worker == self.worker
+            ]
+            busy = {
+                idx
+                for idx, done, _, lease_until in rows
+                if done or (lease_until is not None and lease_until > now)
+            }
+            indices = range(0, total, step)
+
+            if own:
+                idx = own[0]
+            else:
+                # Stops after at most len(busy) + 1 candidates, so huge
+                # counters cost no more than short lists
+                idx = next((i for i in indices if i not in busy), None)
+                if idx is None:
+                    return None
+            conn.execute(
+                "INSERT INTO claims (iterator_id, idx, done, worker, lease_until) "
+                "VALUES (?, ?, 0, ?, ?) ON CONFLICT(iterator_id, idx) DO UPDATE SET "
+                "worker = excluded.worker, lease_until = excluded.lease_until",
+                (iterator_id, idx, self.worker, now + self.lease_seconds),
+            )
+            done = {i for i, d, _, _ in rows if d and i in indices}
+            return idx, len(indices) - len(done | {idx})
+
+        return self._transaction(apply)
+
+    def next_expiry(self, iterator_id, total, step=1):
+        # Earliest lease_until among other workers' open claims, None when
+        # every index is done
+        def apply(conn):
+            rows = conn.execute(
+                "SELECT idx, lease_until FROM claims "
+                "WHERE iterator_id = ? AND done = 0 AND worker != ?",
+                (iterator_id, self.worker),
+            ).fetchall()
+            leases = [until for idx, until in rows if idx in range(0, total, step)]
+            return min(leases) if leases else None
+
+        return self._transaction(apply)
+
+    def complete(self, iterator_id):
+        # Marks this worker's open claims on iterator_id as done
+        def apply(conn):
+            cur = conn.execute(
+                "UPDATE claims SET done = 1, lease_until = NULL "
+                "WHERE iterator_id = ? AND worker = ? AND done = 0",
+                (iterator_id, self.worker),
+            )
+            return cur.rowcount
+
+        return self._transaction(apply)
+
+    def reset(self, iterator_id):
+        self._transaction(
+            lambda conn: conn.execute(
+                "DELETE FROM claims WHERE iterator_id = ?", (iterator_id,)
+            )
+        )
+
+
+def _default_claims_path():
+    try:
+        import folder_paths
+
+        base = folder_paths.get_user_directory()
+    except (ImportError, AttributeError):
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, "automation_work_claims.db")
+
+
+def create_work_claims(path=None):
+    return WorkClaims(path or _CLAIMS_PATH or _default_claims_path())
+
+
+def execution_blocker():
+    # Output value that silently skips every node downstream of it
+    try:
+        from comfy_execution.graph import ExecutionBlocker
+
+        return ExecutionBlocker(None)
+    except ImportError:
+        return None